@@ -1,9 +1,15 @@
 import streamlit as st
-import json
 import os
-from utils.match_engine import extract_symptoms, match_conditions
-from utils.llm_formatter import get_explanation
+from utils.analysis import analyze_symptoms_cached
+from utils.cache import get_cache_backend
+from utils.catalog import get_catalog, get_catalog_paths, get_default_catalog_name
+from utils.jobs import get_job_queue
+from utils.llm_formatter import (
+    explanation_view,
+    submit_explanation_job
+)
 from utils.config import check_api_key
+from utils.profiling import profile_request
 
 # Initialize session states
 if 'openai_api_key' not in st.session_state:
@@ -21,9 +27,14 @@ if 'selected_match' not in st.session_state:
 if 'show_details' not in st.session_state:
     st.session_state.show_details = None
 
+# Finished explanations by job key (prompt hash), and the job key of each
+# condition in the current analysis
 if 'generated_explanation' not in st.session_state:
     st.session_state.generated_explanation = {}
 
+if 'explanation_jobs' not in st.session_state:
+    st.session_state.explanation_jobs = {}
+
 if 'symptoms_input' not in st.session_state:
     st.session_state.symptoms_input = ""
 
@@ -69,6 +80,13 @@ def close_modal():
     st.session_state.selected_condition = None
     st.session_state.selected_match = None
 
+def reset_analysis_state():
+    """Forget views and explanation jobs tied to the previous analysis."""
+    close_modal()
+    st.session_state.show_details = None
+    st.session_state.generated_explanation = {}
+    st.session_state.explanation_jobs = {}
+
 # Modern UI Configuration
 st.set_page_config(
     page_title="Clinify.ai - Smart Health Assistant",
@@ -113,17 +131,79 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load conditions data
-@st.cache_data
-def load_conditions():
+# Route the session to a catalog by name (?catalog=pediatrics). Catalogs and
+# their lexicons and indexes are process-wide, so they're already built when
+# the server was started through serve.py
+catalog_names = list(get_catalog_paths())
+catalog_name = st.query_params.get("catalog", get_default_catalog_name())
+
+def load_catalog(name):
     try:
-        with open('data/conditions.json', 'r') as f:
-            return json.load(f)
+        return get_catalog(name)
     except Exception as e:
         st.error(f"Error loading conditions data: {e}")
-        return {}
+        return {'fingerprint': '', 'conditions': {}, 'lexicon': None, 'index': None, 'semantic_index': None}
+
+catalog = load_catalog(catalog_name)
+conditions_data = catalog['conditions']
+
+# Results from another catalog can't be shown against this one
+if st.session_state.get('catalog_name') != catalog_name:
+    st.session_state.catalog_name = catalog_name
+    st.session_state.diagnosis_results = None
+    reset_analysis_state()
+
+# Match-result and explanation cache, shared across sessions (and replicas
+# when CLINIFY_CACHE_URL points at SQLite or Redis)
+cache_backend = get_cache_backend()
+
+def show_ai_analysis(match, view):
+    """Render the AI analysis for a match, polling its background job only while it runs."""
+    condition = match['condition']
+    job_key = st.session_state.explanation_jobs.get(condition)
+    
+    # Finished explanations are kept for the rest of the session
+    if job_key in st.session_state.generated_explanation:
+        st.markdown(st.session_state.generated_explanation[job_key])
+        return
+    
+    # LLM calls run on the shared job queue, so reruns only look up status and
+    # the same analysis is never sent twice
+    job = get_job_queue().get(job_key) if job_key else None
+    if job is None or (job['status'] == 'failed' and st.button("🔄 Retry AI analysis", key=f"retry_{view}_{condition}")):
+        job = submit_explanation_job(
+            symptoms=st.session_state.diagnosis_results['symptoms_text'],
+            condition=condition,
+            matched_symptoms=match['matched_symptoms'],
+            context=st.session_state.diagnosis_results['context'],
+            match_data=match,
+            cache=cache_backend
+        )
+        st.session_state.explanation_jobs[condition] = job['key']
+    
+    if job['status'] in ('done', 'failed'):
+        view = explanation_view(job, condition, match['matched_symptoms'])
+        if job['status'] == 'done':
+            st.session_state.generated_explanation[job['key']] = view['text']
+        st.markdown(view['text'])
+    else:
+        poll_ai_analysis(match, job['key'])
 
-conditions_data = load_conditions()
+@st.fragment(run_every="2s")
+def poll_ai_analysis(match, job_key):
+    """Show progress of a running explanation job; only rendered until it finishes."""
+    job = get_job_queue().get(job_key)
+    if job is None or job['status'] in ('done', 'failed'):
+        # Hand over to show_ai_analysis, which renders the outcome without polling
+        st.rerun()
+    else:
+        # Past the deadline, the catalog summary is shown until the answer arrives
+        condition = match['condition']
+        view = explanation_view(job, condition, match['matched_symptoms'], conditions_data.get(condition))
+        if view['text']:
+            st.markdown(view['text'])
+        else:
+            st.info("⏳ Generating AI analysis...")
 
 # Create two main columns for layout
 main_col1, main_col2 = st.columns([2, 1])
@@ -186,6 +266,7 @@ with main_col2:
 if clear_button:
     st.session_state.diagnosis_results = None
     st.session_state.submitted = False
+    reset_analysis_state()
     st.rerun()
 
 # Process symptoms
@@ -193,54 +274,18 @@ if submit_button and symptoms_text:
     st.session_state.submitted = True
     
     with st.spinner("🔍 Analyzing your symptoms..."):
-        extracted_symptoms, context = extract_symptoms(symptoms_text, conditions_data)
+        # Shared across sessions and replicas through the configured cache backend
+        with profile_request("analyze", len(symptoms_text)) as profile_record:
+            analysis = analyze_symptoms_cached(symptoms_text, catalog, cache_backend)
+            profile_record['symptom_count'] = len(analysis['extracted_symptoms'])
         
         # Remove debug information displays
-        if not extracted_symptoms:
+        if not analysis['extracted_symptoms']:
             st.error("⚠️ No symptoms detected. Please provide more specific symptoms for accurate analysis.")
         else:
-            # Get all symptoms from conditions data for matching
-            all_symptoms = set()
-            for condition in conditions_data.values():
-                all_symptoms.update([s.lower() for s in condition['symptoms']])
-            
-            # Match conditions
-            matched_conditions = []
-            for condition_name, condition_data in conditions_data.items():
-                condition_symptoms = [s.lower() for s in condition_data['symptoms']]
-                matched_symptoms = [s for s in extracted_symptoms if s.lower() in condition_symptoms]
-                
-                if matched_symptoms:
-                    match_percentage = len(matched_symptoms) / len(condition_data['symptoms'])
-                    
-                    # Determine confidence level
-                    if match_percentage >= 0.7:
-                        confidence = "High"
-                    elif match_percentage >= 0.4:
-                        confidence = "Medium"
-                    else:
-                        confidence = "Low"
-                    
-                    matched_conditions.append({
-                        'condition': condition_name,
-                        'match_count': len(matched_symptoms),
-                        'total_symptoms': len(condition_data['symptoms']),
-                        'match_percentage': match_percentage,
-                        'confidence': confidence,
-                        'matched_symptoms': matched_symptoms,
-                        'severity': condition_data.get('severity', 'Unknown')
-                    })
-            
-            # Sort by match percentage
-            matched_conditions.sort(key=lambda x: x['match_percentage'], reverse=True)
-            
-            # Store in session state
-            st.session_state.diagnosis_results = {
-                'symptoms_text': symptoms_text,
-                'extracted_symptoms': extracted_symptoms,
-                'top_matches': matched_conditions[:3] if matched_conditions else [],
-                'context': context
-            }
+            # Store in session state; views and explanations of the previous analysis no longer apply
+            st.session_state.diagnosis_results = analysis
+            reset_analysis_state()
             
             # Remove debug information display
 
@@ -331,19 +376,7 @@ if st.session_state.submitted and st.session_state.diagnosis_results:
                 # AI Analysis (generated only when viewing details)
                 if api_key_status:
                     st.markdown("### 🤖 AI Analysis")
-                    # Check if we already have generated explanation for this condition
-                    if selected_match['condition'] not in st.session_state.generated_explanation:
-                        with st.spinner("Generating AI analysis..."):
-                            explanation = get_explanation(
-                                symptoms=st.session_state.diagnosis_results['symptoms_text'],
-                                condition=selected_match['condition'],
-                                matched_symptoms=selected_match['matched_symptoms'],
-                                context=st.session_state.diagnosis_results['context'],
-                                match_data=selected_match
-                            )
-                            st.session_state.generated_explanation[selected_match['condition']] = explanation
-                    
-                    st.markdown(st.session_state.generated_explanation[selected_match['condition']])
+                    show_ai_analysis(selected_match, "details")
             
             with col2:
                 # Severity Level
@@ -388,17 +421,8 @@ if st.session_state.show_modal:
                 close_modal()
         
         if api_key_status:
-            with st.spinner("Generating detailed analysis..."):
-                explanation = get_explanation(
-                    symptoms=st.session_state.diagnosis_results['symptoms_text'],
-                    condition=st.session_state.selected_condition,
-                    matched_symptoms=st.session_state.selected_match['matched_symptoms'],
-                    context=st.session_state.diagnosis_results['context'],
-                    match_data=st.session_state.selected_match
-                )
-                
-                # Display explanation in a structured way
-                st.markdown(explanation)
+            # Shares the job started by the details view, so it is never generated twice
+            show_ai_analysis(st.session_state.selected_match, "modal")
         else:
             st.info(
                 f"This condition matches the following symptoms:\n" +
@@ -429,6 +453,20 @@ with st.sidebar:
     
     st.divider()
     
+    # Catalog selection, only when several specialty catalogs are registered
+    if len(catalog_names) > 1:
+        st.markdown("### 📚 Condition Catalog")
+        selected_catalog = st.selectbox(
+            "Catalog",
+            catalog_names,
+            index=catalog_names.index(catalog_name) if catalog_name in catalog_names else 0,
+            label_visibility="collapsed"
+        )
+        if selected_catalog != catalog_name:
+            st.query_params["catalog"] = selected_catalog
+            st.rerun()
+        st.divider()
+    
     # About section
     st.markdown("### ℹ️ About Clinify.ai")
     st.markdown("""
@@ -0,0 +1,57 @@
+"""
+Analyze a JSONL corpus of patient notes and export the results to Parquet
+
+Usage: python scripts/batch_analyze.py notes.jsonl results.parquet [--catalog general] [--top-k 10]
+
+Each input line is {"id": ..., "text": ...}. Results are streamed to Parquet in
+row groups, with symptom and condition IDs resolved through
+results.symptoms.parquet and results.conditions.parquet. Set CLINIFY_PROFILE to
+capture profiles of slow notes (see utils/profiling.py).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.analysis import analyze_symptoms
+from utils.catalog import get_catalog
+from utils.export import DEFAULT_ROW_GROUP_SIZE, export_results
+from utils.profiling import profile_request
+
+def analyze_notes(path: str, catalog: dict, top_k: int):
+    """Yield (id, analysis) for each note in a JSONL file"""
+    with open(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            note = json.loads(line)
+            with profile_request("batch", len(note['text'])) as profile_record:
+                analysis = analyze_symptoms(note['text'], catalog, top_k=top_k)
+                profile_record['symptom_count'] = len(analysis['extracted_symptoms'])
+            yield str(note.get('id', line_number)), analysis
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('notes', help="JSONL file with id and text fields")
+    parser.add_argument('output', help="Parquet file to write")
+    parser.add_argument('--catalog', default=None, help="registered catalog name (default: CLINIFY_DEFAULT_CATALOG)")
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--row-group-size', type=int, default=DEFAULT_ROW_GROUP_SIZE)
+    args = parser.parse_args()
+
+    catalog = get_catalog(args.catalog)
+    start = time.perf_counter()
+
+    rows_written = export_results(
+        args.output, catalog, analyze_notes(args.notes, catalog, args.top_k), args.row_group_size
+    )
+
+    elapsed = time.perf_counter() - start
+    print(f"Exported {rows_written} results to {args.output} in {elapsed:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
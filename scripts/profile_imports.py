@@ -0,0 +1,74 @@
+"""
+Profile cold-start import time of the modules app.py loads at startup
+
+Usage: python scripts/profile_imports.py [--top N] [module ...]
+
+Each module set is imported in a fresh interpreter with `-X importtime`, and
+the slowest top-level imports are reported along with whether the LLM stack
+was pulled in.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ['streamlit', 'utils.config', 'utils.match_engine', 'utils.llm_formatter', 'utils.catalog']
+LLM_PACKAGES = ('langchain', 'langchain_openai', 'openai')
+
+def profile_imports(modules):
+    """Import `modules` in a fresh interpreter and parse the -X importtime report"""
+    code = "; ".join(f"import {module}" for module in modules) or "pass"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = len(name) - len(name.lstrip())
+        entries.append({
+            'module': name.strip(),
+            'depth': depth,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000
+        })
+    return entries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--top', type=int, default=15, help="number of slowest imports to show")
+    args = parser.parse_args()
+    
+    # Drop what the interpreter imports on its own before running any code
+    baseline = {entry['module'] for entry in profile_imports([])}
+    entries = [entry for entry in profile_imports(args.modules) if entry['module'] not in baseline]
+    if not entries:
+        print("Total import time: 0.0 ms (already imported by the interpreter at startup)")
+        return
+    # Top-level entries have the smallest indentation; their cumulative times add up to the total
+    top_depth = min(entry['depth'] for entry in entries)
+    top_level = [entry for entry in entries if entry['depth'] == top_depth]
+    total_ms = sum(entry['cumulative_ms'] for entry in top_level)
+    
+    print(f"Total import time: {total_ms:.1f} ms")
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for entry in sorted(top_level, key=lambda e: e['cumulative_ms'], reverse=True)[:args.top]:
+        print(f"{entry['cumulative_ms']:>14.1f}  {entry['self_ms']:>8.1f}  {entry['module']}")
+    
+    loaded_llm = sorted({entry['module'] for entry in entries if entry['module'].split('.')[0] in LLM_PACKAGES})
+    if loaded_llm:
+        print(f"\nLLM stack imported at startup: {', '.join(loaded_llm[:5])}")
+    else:
+        print("\nLLM stack not imported at startup")
+
+if __name__ == "__main__":
+    main()
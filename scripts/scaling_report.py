@@ -0,0 +1,120 @@
+"""
+Measure symptom extraction + condition matching at growing catalog sizes
+
+Usage: python scripts/scaling_report.py --scales 10000 100000 1000000 --notes 500
+
+Each scale runs in a fresh process so peak RSS is attributable to that catalog.
+The report lists resource build time, throughput, p50/p99 latency and peak RSS
+per scale, and the empirical growth exponent between consecutive scales
+(latency ~ n^k; k near 0 is flat, near 1 is linear in catalog size).
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+def run_worker(catalog_path: str, notes_path: str) -> dict:
+    """Load one catalog, analyze every note and return the measurements"""
+    from utils.analysis import analyze_symptoms
+    from utils.catalog import load_catalog_resources
+    from utils.profiling import profile_request
+
+    build_start = time.perf_counter()
+    catalog = load_catalog_resources(catalog_path)
+    build_seconds = time.perf_counter() - build_start
+
+    with open(notes_path, 'r') as f:
+        notes = [json.loads(line)['text'] for line in f]
+
+    latencies = []
+    run_start = time.perf_counter()
+    for text in notes:
+        start = time.perf_counter()
+        with profile_request("scaling", len(text)) as profile_record:
+            profile_record['conditions'] = len(catalog['conditions'])
+            analyze_symptoms(text, catalog)
+        latencies.append(time.perf_counter() - start)
+    run_seconds = time.perf_counter() - run_start
+
+    return {
+        'conditions': len(catalog['conditions']),
+        'notes': len(notes),
+        'build_seconds': build_seconds,
+        'throughput': len(notes) / run_seconds if run_seconds else 0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+def growth_exponent(n_small, n_large, value_small, value_large):
+    """Slope of log(value) against log(n) between two scales"""
+    if min(n_small, n_large, value_small, value_large) <= 0 or n_small == n_large:
+        return float('nan')
+    return math.log(value_large / value_small) / math.log(n_large / n_small)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--notes', type=int, default=500)
+    parser.add_argument('--zipf', type=float, default=1.1)
+    parser.add_argument('--data-dir', default=None, help="where to write catalogs (default: a temporary directory)")
+    parser.add_argument('--json', action='store_true', help="print raw measurements as JSON")
+    parser.add_argument('--worker', nargs=2, metavar=('CATALOG', 'NOTES'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(*args.worker)))
+        return
+
+    from synth_catalog import generate
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="clinify-scaling-")
+    results = []
+    for scale in args.scales:
+        paths = generate(data_dir, scale, args.notes, exponent=args.zipf)
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', paths['catalog'], paths['notes']],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        results.append(json.loads(output.stdout))
+        print(f"measured {scale} conditions", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'conditions':>11} {'build s':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>8}")
+    for result in results:
+        print(
+            f"{result['conditions']:>11} {result['build_seconds']:>8.2f} {result['throughput']:>9.1f} "
+            f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['peak_rss_mb']:>8.1f}"
+        )
+
+    if len(results) > 1:
+        print("\nGrowth exponent k (metric ~ n^k) between consecutive scales:")
+        for small, large in zip(results, results[1:]):
+            span = f"{small['conditions']} -> {large['conditions']}"
+            exponents = {
+                metric: growth_exponent(small['conditions'], large['conditions'], small[metric], large[metric])
+                for metric in ('build_seconds', 'p50_ms', 'p99_ms', 'peak_rss_mb')
+            }
+            print(f"  {span:>22}: " + ", ".join(f"{metric} k={k:.2f}" for metric, k in exponents.items()))
+
+if __name__ == "__main__":
+    main()
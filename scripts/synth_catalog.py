@@ -0,0 +1,180 @@
+"""
+Generate synthetic condition catalogs and patient-note corpora for load testing
+
+Usage: python scripts/synth_catalog.py --conditions 100000 --notes 2000 --out-dir /tmp/clinify-synth
+
+Symptom usage across conditions follows a Zipfian distribution, seeded from the
+real symptom and risk factor vocabulary in data/conditions.json, so a few
+symptoms (fever, fatigue) are shared by a large share of the catalog while the
+long tail is rare, as in a real ontology.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+from typing import Dict, Iterator, List, Set
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_CATALOG = os.path.join(ROOT, 'data', 'conditions.json')
+
+BODY_SITES = [
+    "head", "neck", "chest", "back", "abdomen", "pelvis", "arm", "leg", "hand", "foot",
+    "knee", "hip", "shoulder", "eye", "ear", "throat", "skin", "jaw", "wrist", "ankle"
+]
+FINDINGS = [
+    "pain", "swelling", "numbness", "tingling", "stiffness", "itching", "burning",
+    "weakness", "cramping", "tenderness", "redness", "rash", "bruising", "twitching"
+]
+MODIFIERS = ["", "sharp", "dull", "intermittent", "persistent", "sudden", "mild", "severe", "recurring"]
+
+FILLER_SENTENCES = [
+    "I have not traveled recently.",
+    "It started after work on Monday.",
+    "I tried resting but it did not help much.",
+    "My sleep has been okay otherwise.",
+    "I am drinking plenty of water.",
+    "Nobody else at home is sick."
+]
+DURATIONS = ["for 2 days", "for 3 weeks", "since yesterday", "for 6 months", "chronic", ""]
+SEVERITIES = ["mild", "moderate", "severe", "intense", ""]
+
+def load_seed_vocabulary(path: str = SEED_CATALOG) -> Dict[str, List[str]]:
+    """Real symptoms, severities and risk factors to seed the synthetic vocabulary"""
+    with open(path, 'r') as f:
+        conditions = json.load(f)
+
+    symptoms = sorted({symptom for condition in conditions.values() for symptom in condition['symptoms']})
+    return {
+        'symptoms': symptoms,
+        'severities': sorted({condition['severity'] for condition in conditions.values()}),
+        'risk_factors': sorted({factor for condition in conditions.values() for factor in condition.get('risk_factors', [])})
+    }
+
+def build_symptom_vocabulary(size: int, seed_symptoms: List[str]) -> List[str]:
+    """Real symptoms first (the Zipf head), then composed body-site findings"""
+    vocabulary = list(seed_symptoms)
+    for modifier, site, finding in itertools.product(MODIFIERS, BODY_SITES, FINDINGS):
+        if len(vocabulary) >= size:
+            break
+        vocabulary.append(" ".join(part for part in (modifier, site, finding) if part).capitalize())
+    # Past the composed space, number the tail so every entry stays unique
+    vocabulary.extend(f"Finding {i:06d}" for i in range(size - len(vocabulary)))
+    return vocabulary[:size]
+
+def zipf_cum_weights(n: int, exponent: float) -> List[float]:
+    """Cumulative Zipf weights for ranks 1..n, for random.choices(cum_weights=...)"""
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, n + 1)))
+
+def iter_conditions(
+    n_conditions: int,
+    vocabulary: List[str],
+    seed_vocabulary: Dict[str, List[str]],
+    exponent: float,
+    rng: random.Random
+) -> Iterator[tuple]:
+    """Yield (name, condition data) pairs with Zipf-distributed symptom lists"""
+    cum_weights = zipf_cum_weights(len(vocabulary), exponent)
+    name_width = len(str(n_conditions))
+
+    for i in range(n_conditions):
+        n_symptoms = rng.randint(5, 12)
+        symptoms = []
+        while len(symptoms) < n_symptoms:
+            for symptom in rng.choices(vocabulary, cum_weights=cum_weights, k=n_symptoms):
+                if symptom not in symptoms and len(symptoms) < n_symptoms:
+                    symptoms.append(symptom)
+
+        condition = {
+            'symptoms': symptoms,
+            'severity': rng.choice(seed_vocabulary['severities']),
+            'contagious': rng.random() < 0.3
+        }
+        if rng.random() < 0.35:
+            condition['risk_factors'] = rng.sample(seed_vocabulary['risk_factors'], rng.randint(1, 3))
+
+        yield f"Synthetic Condition {i:0{name_width}d}", condition
+
+def write_catalog(path: str, conditions: Iterator[tuple]) -> int:
+    """Stream conditions into a conditions.json-shaped file without holding it in memory"""
+    count = 0
+    with open(path, 'w') as f:
+        f.write("{\n")
+        for name, condition in conditions:
+            if count:
+                f.write(",\n")
+            f.write(f"{json.dumps(name)}: {json.dumps(condition)}")
+            count += 1
+        f.write("\n}\n")
+    return count
+
+def generate_note(condition: Dict, rng: random.Random) -> str:
+    """Compose a free-text patient note that mentions a few of a condition's symptoms"""
+    mentioned = rng.sample(condition['symptoms'], min(len(condition['symptoms']), rng.randint(2, 5)))
+    severity = rng.choice(SEVERITIES)
+    duration = rng.choice(DURATIONS)
+
+    sentences = [f"I have {severity + ' ' if severity else ''}{mentioned[0].lower()} {duration}".strip() + "."]
+    sentences += [f"I also noticed {symptom.lower()}." for symptom in mentioned[1:]]
+    if condition.get('risk_factors') and rng.random() < 0.5:
+        sentences.append(f"There is some {rng.choice(condition['risk_factors']).replace('_', ' ')} in my history.")
+    sentences += rng.sample(FILLER_SENTENCES, rng.randint(0, 3))
+    rng.shuffle(sentences)
+    return " ".join(sentences)
+
+def sample_note_conditions(n_conditions: int, n_notes: int, exponent: float, rng: random.Random) -> List[int]:
+    """Pick the condition index behind each note; frequently seen conditions follow Zipf too"""
+    cum_weights = zipf_cum_weights(n_conditions, exponent)
+    return rng.choices(range(n_conditions), cum_weights=cum_weights, k=n_notes)
+
+def capture_conditions(conditions: Iterator[tuple], wanted: Set[int], captured: Dict[int, Dict]) -> Iterator[tuple]:
+    """Pass conditions through, keeping the ones at the `wanted` indices for note generation"""
+    for i, (name, condition) in enumerate(conditions):
+        if i in wanted:
+            captured[i] = condition
+        yield name, condition
+
+def write_notes(path: str, note_conditions: List[Dict], rng: random.Random) -> int:
+    """Write a JSONL corpus with one patient note per entry of `note_conditions`"""
+    with open(path, 'w') as f:
+        for i, condition in enumerate(note_conditions):
+            f.write(json.dumps({'id': f"note-{i:07d}", 'text': generate_note(condition, rng)}) + "\n")
+    return len(note_conditions)
+
+def generate(out_dir: str, n_conditions: int, n_notes: int, vocabulary_size: int = None,
+             exponent: float = 1.1, seed: int = 0) -> Dict[str, str]:
+    """Generate a catalog and note corpus under `out_dir` and return their paths"""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    seed_vocabulary = load_seed_vocabulary()
+    # Vocabulary grows sublinearly with the catalog, like a real ontology
+    vocabulary_size = vocabulary_size or max(len(seed_vocabulary['symptoms']), int(n_conditions ** 0.75) * 4)
+    vocabulary = build_symptom_vocabulary(vocabulary_size, seed_vocabulary['symptoms'])
+
+    catalog_path = os.path.join(out_dir, f"conditions_{n_conditions}.json")
+    notes_path = os.path.join(out_dir, f"notes_{n_conditions}.jsonl")
+    # Only the conditions the notes are drawn from are kept while the catalog
+    # streams to disk, instead of reading the whole catalog back
+    note_indices = sample_note_conditions(n_conditions, n_notes, exponent, rng)
+    captured = {}
+    conditions = iter_conditions(n_conditions, vocabulary, seed_vocabulary, exponent, rng)
+    write_catalog(catalog_path, capture_conditions(conditions, set(note_indices), captured))
+    write_notes(notes_path, [captured[i] for i in note_indices], rng)
+    return {'catalog': catalog_path, 'notes': notes_path}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--conditions', type=int, default=10000)
+    parser.add_argument('--notes', type=int, default=1000)
+    parser.add_argument('--vocabulary', type=int, default=None, help="distinct symptoms (default grows with catalog size)")
+    parser.add_argument('--zipf', type=float, default=1.1, help="Zipf exponent for symptom and condition frequency")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out-dir', default=os.path.join(ROOT, 'synthetic'))
+    args = parser.parse_args()
+
+    paths = generate(args.out_dir, args.conditions, args.notes, args.vocabulary, args.zipf, args.seed)
+    print(f"Catalog: {paths['catalog']}")
+    print(f"Notes:   {paths['notes']}")
+
+if __name__ == "__main__":
+    main()
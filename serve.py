@@ -0,0 +1,26 @@
+"""
+Launch the Streamlit app after warming up the catalog, lexicon and index
+
+Usage: python serve.py [streamlit run options...] [-- script args...]
+
+Streamlit runs app.py in this process, so resources built here by `warm_up`
+are reused by the first session instead of being built on its first click.
+Options are parsed by Streamlit's own `run` command, so config flags such as
+--server.port 8080 --server.address 0.0.0.0 work as with `streamlit run`.
+"""
+import os
+import sys
+
+from utils.catalog import warm_up
+
+def main():
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+    preload_llm = os.getenv("CLINIFY_PRELOAD_LLM", "0") == "1"
+    
+    warm_up(preload_llm=preload_llm)
+    
+    from streamlit.web import cli
+    cli.main(["run", app_path, *sys.argv[1:]], prog_name="streamlit")
+
+if __name__ == "__main__":
+    main()
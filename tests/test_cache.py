@@ -0,0 +1,122 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from utils import cache as cache_module
+from utils.cache import CacheBackend, MemoryCache, RedisCache, SQLiteCache, get_or_compute
+
+@pytest.fixture(params=['memory', 'sqlite', 'redis'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryCache()
+    if request.param == 'sqlite':
+        return SQLiteCache(str(tmp_path / "cache.db"))
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisCache(client=fakeredis.FakeRedis())
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+def test_set_get_delete(backend):
+    backend.set("key", {"value": [1, 2]})
+    assert backend.get("key") == {"value": [1, 2]}
+    backend.delete("key")
+    assert backend.get("key") is None
+
+def test_add_only_writes_absent_keys(backend):
+    assert backend.add("lock", 1, ttl=10)
+    assert not backend.add("lock", 2, ttl=10)
+    assert backend.get("lock") == 1
+
+def test_entries_expire(backend):
+    backend.set("key", "value", ttl=0.05)
+    assert backend.add("lock", 1, ttl=0.05)
+    time.sleep(0.1)
+    assert backend.get("key") is None
+    assert backend.add("lock", 2, ttl=10)
+
+def test_sqlite_prunes_expired_rows(tmp_path):
+    path = str(tmp_path / "cache.db")
+    backend = SQLiteCache(path, prune_interval=50)
+    for i in range(49):
+        backend.set(f"key{i}", i, ttl=0.01)
+    time.sleep(0.05)
+    backend.set("fresh", "value", ttl=60)
+
+    rows = sqlite3.connect(path).execute("SELECT key FROM cache").fetchall()
+    assert rows == [("fresh",)]
+
+def test_get_or_compute_coalesces_concurrent_misses(backend):
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(get_or_compute(backend, "key", compute, ttl=60)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+    assert backend.get("key") == "value"
+
+def test_get_or_compute_does_not_cache_failures(backend):
+    def fail():
+        raise RuntimeError("upstream error")
+
+    with pytest.raises(RuntimeError):
+        get_or_compute(backend, "key", fail, ttl=60)
+    assert backend.get("key") is None
+    assert backend.get("lock:key") is None
+    assert get_or_compute(backend, "key", lambda: "value", ttl=60) == "value"
+
+def test_get_or_compute_waits_for_another_replica(backend, monkeypatch):
+    monkeypatch.setattr(cache_module, "LOCK_POLL_INTERVAL", 0.01)
+    # Another replica holds the compute lock and stores the value shortly after
+    assert backend.add("lock:key", 12345, ttl=10)
+    threading.Timer(0.1, backend.set, ("key", "from leader", 60)).start()
+
+    def compute():
+        raise AssertionError("follower must not compute")
+
+    assert get_or_compute(backend, "key", compute, ttl=60) == "from leader"
+
+def test_get_or_compute_takes_over_expired_lock(backend, monkeypatch):
+    monkeypatch.setattr(cache_module, "LOCK_POLL_INTERVAL", 0.01)
+    assert backend.add("lock:key", 12345, ttl=0.1)
+
+    assert get_or_compute(backend, "key", lambda: "value", ttl=60) == "value"
+
+def test_match_cache_computes_locally_without_a_lock():
+    from utils.analysis import analyze_symptoms_cached
+    from utils.catalog import get_catalog
+
+    class RecordingCache(MemoryCache):
+        def __init__(self):
+            super().__init__()
+            self.added = []
+
+        def _add_raw(self, key, raw, ttl):
+            self.added.append(key)
+            return super()._add_raw(key, raw, ttl)
+
+    backend = RecordingCache()
+    first = analyze_symptoms_cached("I have a cough and a fever", get_catalog(), backend)
+    second = analyze_symptoms_cached("I have a cough and a fever", get_catalog(), backend)
+
+    assert backend.added == []
+    assert [match['condition'] for match in second['top_matches']] == [match['condition'] for match in first['top_matches']]
@@ -0,0 +1,44 @@
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from utils.analysis import analyze_symptoms
+from utils.catalog import get_catalog
+from utils.export import build_export_vocabulary, export_results
+
+NOTES = [
+    ("a", "I have a cough and a fever for 3 days, I smoke"),
+    ("b", "Severe headache and nausea, never been a smoker"),
+    ("c", "My knee glows purple"),
+]
+
+def test_export_round_trips_ids_through_dimension_tables(tmp_path):
+    catalog = get_catalog()
+    analyses = {input_id: analyze_symptoms(text, catalog) for input_id, text in NOTES}
+    path = tmp_path / "results.parquet"
+
+    rows = export_results(str(path), catalog, analyses.items(), row_group_size=2)
+
+    assert rows == len(NOTES)
+    results = pq.read_table(path)
+    assert pq.ParquetFile(path).num_row_groups == 2
+    assert 'negations' in results.schema.names
+    symptom_names = pq.read_table(tmp_path / "results.symptoms.parquet").column('symptom').to_pylist()
+    condition_names = pq.read_table(tmp_path / "results.conditions.parquet").column('condition').to_pylist()
+
+    for row in results.to_pylist():
+        analysis = analyses[row['input_id']]
+        clues = analysis['context']['context_clues']
+        exported_symptoms = [symptom_names[i] for i in row['symptom_ids']] + row['other_symptoms']
+        assert sorted(s.lower() for s in exported_symptoms) == sorted(s.lower() for s in analysis['extracted_symptoms'])
+        assert [condition_names[i] for i in row['condition_ids']] == [match['condition'] for match in analysis['top_matches']]
+        assert row['catalog'] == catalog['fingerprint']
+        assert row['risk_factors'] == [factor for factor, _ in clues['risk_factors']]
+        assert row['negations'] == clues['negations']
+
+def test_export_ids_depend_only_on_the_catalog():
+    catalog = get_catalog()
+    first = build_export_vocabulary(catalog)
+    second = build_export_vocabulary(dict(catalog, conditions=dict(reversed(list(catalog['conditions'].items())))))
+    assert first == second
@@ -0,0 +1,88 @@
+import threading
+import time
+
+from utils import llm_formatter
+from utils.jobs import JobQueue
+from utils.llm_formatter import explanation_view, generate_explanation, submit_explanation_job
+
+def wait_for(queue, key, status):
+    for _ in range(200):
+        job = queue.get(key)
+        if job and job['status'] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {key} never reached {status}")
+
+def test_live_jobs_are_not_submitted_twice():
+    queue = JobQueue(max_workers=2)
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    first = queue.submit("key", work)
+    second = queue.submit("key", work)
+    release.set()
+    wait_for(queue, "key", 'done')
+    third = queue.submit("key", work)
+
+    assert first['submitted_at'] == second['submitted_at'] == third['submitted_at']
+    assert third['result'] == "result"
+    assert len(calls) == 1
+
+def test_failed_jobs_are_retried():
+    queue = JobQueue(max_workers=1)
+    outcomes = iter([RuntimeError("upstream error"), "result"])
+
+    def work():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    queue.submit("key", work)
+    assert wait_for(queue, "key", 'failed')['error'] == "upstream error"
+    queue.submit("key", work)
+    assert wait_for(queue, "key", 'done')['result'] == "result"
+
+def test_finished_jobs_are_evicted():
+    queue = JobQueue(max_workers=1, finished_ttl=0.05)
+    calls = []
+    queue.submit("key", lambda: calls.append(1))
+    wait_for(queue, "key", 'done')
+    time.sleep(0.1)
+
+    queue.submit("other", lambda: None)
+    assert queue.get("key") is None
+    queue.submit("key", lambda: calls.append(1))
+    wait_for(queue, "key", 'done')
+    assert len(calls) == 2
+
+def test_explanation_view_falls_back_after_the_deadline():
+    job = {'status': 'running', 'result': None, 'error': None, 'submitted_at': time.time() - 1}
+    assert explanation_view(job, "Flu", ["fever"], deadline=5)['source'] == 'pending'
+    fallback = explanation_view(job, "Flu", ["fever"], {'description': "A viral infection"}, deadline=0.5)
+    assert fallback['source'] == 'fallback'
+    assert "A viral infection" in fallback['text']
+
+def test_generate_explanation_serves_fallback_then_llm_answer(monkeypatch):
+    release = threading.Event()
+
+    def slow_chain(inputs):
+        release.wait(5)
+        return "detailed analysis"
+
+    monkeypatch.setattr(llm_formatter, "run_explanation_chain", slow_chain)
+    queue = JobQueue(max_workers=1)
+    args = ("I have a fever", "Flu", ["fever"])
+
+    first = generate_explanation(*args, deadline=0.05, queue=queue)
+    assert first['source'] == 'fallback'
+    release.set()
+    wait_for(queue, submit_explanation_job(*args, queue=queue)['key'], 'done')
+    second = generate_explanation(*args, deadline=0.05, queue=queue)
+    assert second['source'] == 'llm'
+    assert second['text'] == "detailed analysis"
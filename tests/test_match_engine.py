@@ -0,0 +1,95 @@
+from utils.match_engine import build_condition_index, generate_candidates, match_conditions
+
+CONDITIONS = {
+    'Bronchitis': {'symptoms': ['Cough', 'Fatigue', 'Chest discomfort'], 'severity': 'moderate'},
+    'Common Cold': {'symptoms': ['Cough', 'Runny nose', 'Sore throat'], 'severity': 'mild'},
+    'Flu': {'symptoms': ['Cough', 'Fever', 'Fatigue', 'Body ache'], 'severity': 'moderate'},
+    'Allergy': {'symptoms': ['Runny nose', 'Itchy eyes'], 'severity': 'mild', 'risk_factors': ['genetic']},
+    'Asthma': {'symptoms': ['Cough', 'Wheezing'], 'severity': 'moderate', 'risk_factors': ['smoking']}
+}
+
+def ranking(matches):
+    return [(match['condition'], match['match_percentage']) for match in matches]
+
+def test_two_stage_matches_unbounded_ranking_when_limit_covers_candidates():
+    symptoms = ['Cough', 'Fatigue', 'Runny nose']
+    context = {'context_clues': {'risk_factors': [('smoking', "I'm a smoker")], 'medical_history': []}}
+    index = build_condition_index(CONDITIONS)
+    n_candidates = len(generate_candidates(symptoms, index, limit=None))
+
+    unbounded = match_conditions(symptoms, CONDITIONS, context, index, candidate_limit=None, top_k=None)
+    bounded = match_conditions(symptoms, CONDITIONS, context, index, candidate_limit=n_candidates, top_k=3)
+
+    assert ranking(bounded) == ranking(unbounded)[:3]
+
+def test_ties_are_broken_by_condition_name():
+    conditions = {name: {'symptoms': ['Cough', 'Fever']} for name in ('Zeta', 'Alpha', 'Mu')}
+
+    matches = match_conditions(['Cough'], conditions, candidate_limit=2, top_k=None)
+    assert [match['condition'] for match in matches] == ['Alpha', 'Mu']
+
+    matches = match_conditions(['Cough'], conditions, candidate_limit=None, top_k=2)
+    assert [match['condition'] for match in matches] == ['Alpha', 'Mu']
+
+def test_risk_factors_only_boost_their_conditions():
+    context = {'context_clues': {'risk_factors': [('smoking', 'smoker')]}}
+    matches = {match['condition']: match for match in match_conditions(['Cough'], CONDITIONS, context, top_k=None)}
+
+    assert matches['Asthma']['context_score'] == 0.15
+    assert matches['Flu']['context_score'] == 0
+
+def test_ranking_budgets_come_from_the_environment(monkeypatch):
+    from utils.match_engine import get_candidate_limit, get_top_k
+
+    monkeypatch.setenv("CLINIFY_TOP_K", "5")
+    monkeypatch.setenv("CLINIFY_CANDIDATE_LIMIT", "0")
+    assert get_top_k() == 5
+    assert get_candidate_limit() is None
+
+RISK_CATALOG = {
+    'Lyme Disease': {'symptoms': ['Rash'], 'risk_factors': ['tick_bite', 'outdoor_activity']},
+    'Malaria': {'symptoms': ['Fever'], 'risk_factors': ['travel_tropical']},
+    'COPD': {'symptoms': ['Cough'], 'risk_factors': ['smoking']}
+}
+
+def risk_factors(text):
+    from utils.match_engine import build_context_lexicon, extract_context_clues
+
+    clues = extract_context_clues(text, build_context_lexicon(RISK_CATALOG))
+    return sorted(factor for factor, _ in clues['risk_factors'])
+
+def test_negated_risk_factors_are_skipped():
+    assert risk_factors("I have never been a smoker") == []
+    assert risk_factors("I don't smoke") == []
+    assert risk_factors("no tick bites but I went hiking last week") == ['outdoor_activity']
+
+def test_negated_keys_are_recorded():
+    from utils.match_engine import build_context_lexicon, extract_context_clues
+
+    clues = extract_context_clues("not a smoker, no tick bites, never a smoker", build_context_lexicon(RISK_CATALOG))
+    assert clues['negations'] == ['smoking', 'tick_bite']
+    assert clues['risk_factors'] == []
+
+def test_risk_factor_inflections_match():
+    assert risk_factors("I smoked for 20 years") == ['smoking']
+    assert risk_factors("he smokes a pack a day") == ['smoking']
+    assert risk_factors("I was bitten by a tick") == ['tick_bite']
+
+def test_travel_needs_a_tropical_destination():
+    assert risk_factors("fever after a trip to india") == ['travel_tropical']
+    assert risk_factors("fever after a trip to the grocery store") == []
+    assert risk_factors("I drank a tropical smoothie") == []
+
+def test_bare_generic_words_are_not_risk_factors():
+    assert risk_factors("tick tock, my watch is loud") == []
+    assert risk_factors("there was smoke from the barbecue") == []
+
+def test_shared_lexicon_only_extracts_the_catalogs_risk_factors():
+    from utils.match_engine import build_context_lexicon, extract_context_clues
+
+    other = {'Hepatitis B': {'symptoms': ['Jaundice'], 'risk_factors': ['blood_transfusion']}}
+    lexicon = build_context_lexicon(RISK_CATALOG, shared_vocabulary=frozenset(['blood_transfusion', 'smoking']))
+    assert lexicon['pattern'] is build_context_lexicon(other, frozenset(['tick_bite', 'outdoor_activity', 'travel_tropical', 'smoking']))['pattern']
+
+    clues = extract_context_clues("I smoke and had a blood transfusion last year", lexicon)
+    assert sorted(factor for factor, _ in clues['risk_factors']) == ['smoking']
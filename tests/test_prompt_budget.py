@@ -0,0 +1,66 @@
+from utils.match_engine import extract_context_clues
+from utils.prompt_budget import (
+    MIN_SYMPTOM_TOKENS,
+    count_tokens,
+    dedupe_snippets,
+    fit_prompt_to_budget,
+    truncate_to_tokens
+)
+
+TEMPLATE = "Explain {condition}.\nPATIENT:\n{symptoms}\nCONTEXT:\n{context}"
+
+def long_inputs(n_sentences=40):
+    symptoms = " ".join(f"Day {i}: the cough kept me awake and my head hurt." for i in range(n_sentences))
+    context = "Medical History: " + "; ".join(f"taking medication number {i} since the procedure" for i in range(80))
+    return {'condition': "Bronchitis", 'symptoms': symptoms, 'context': context}
+
+def test_prompt_fits_the_budget_without_dropping_the_patient_text():
+    inputs, report = fit_prompt_to_budget(TEMPLATE, long_inputs(), budget=400)
+
+    assert report['prompt_tokens'] <= 400
+    assert not report['over_budget']
+    assert count_tokens(inputs['symptoms']) >= MIN_SYMPTOM_TOKENS - 5
+    assert inputs['symptoms'].startswith("Day 0")
+    assert report['tokens_saved'] == report['original_tokens'] - report['prompt_tokens']
+
+def test_context_keeps_its_share_when_the_patient_text_is_long():
+    inputs, _ = fit_prompt_to_budget(TEMPLATE, long_inputs(), budget=600)
+
+    assert inputs['context'].startswith("Medical History:")
+    assert count_tokens(inputs['context']) > 100
+
+def test_short_prompts_are_left_alone():
+    inputs = {'condition': "Flu", 'symptoms': "I have a fever.", 'context': "None"}
+    fitted, report = fit_prompt_to_budget(TEMPLATE, inputs, budget=1200)
+
+    assert fitted == inputs
+    assert report['tokens_saved'] == 0
+    assert report['tokenizer'] in ("estimate", "tiktoken:cl100k_base")
+
+def test_template_over_budget_is_reported(caplog):
+    _, report = fit_prompt_to_budget(TEMPLATE, long_inputs(), budget=5)
+
+    assert report['over_budget']
+    assert "over the 5 token budget" in caplog.text
+
+def test_original_tokens_can_count_upstream_compaction():
+    inputs = {'condition': "Flu", 'symptoms': "I have a fever.", 'context': "None"}
+    _, report = fit_prompt_to_budget(TEMPLATE, inputs, budget=1200, original_tokens=100)
+
+    assert report['tokens_saved'] == 100 - report['prompt_tokens']
+
+def test_truncation_respects_the_limit():
+    text = "word " * 50
+    assert count_tokens(truncate_to_tokens(text, 10)) <= 10
+    assert truncate_to_tokens(text, 100) == text
+
+def test_dedupe_drops_repeated_and_contained_snippets():
+    snippets = ["history of asthma", "diagnosed with asthma, history of asthma", "History of asthma", "taking insulin"]
+    assert dedupe_snippets(snippets) == ["diagnosed with asthma, history of asthma", "taking insulin"]
+
+def test_overlapping_history_windows_are_merged():
+    text = "I was diagnosed with asthma previously; history of allergies. Later I had surgery on my knee in a faraway town."
+    history = extract_context_clues(text)['medical_history']
+
+    assert len(history) == 1
+    assert "diagnosed with asthma" in history[0] and "surgery" in history[0]
@@ -0,0 +1,59 @@
+import sys
+import types
+
+import pytest
+
+from utils.semantic import (
+    HASHED_DIM,
+    covers_symptom_words,
+    extend_with_semantic_matches,
+    get_embedder,
+    get_semantic_index,
+    unmatched_spans
+)
+
+CONDITIONS = {
+    'Asthma': {'symptoms': ['Wheezing', 'Chest tightness', 'Shortness of breath']},
+    'Conjunctivitis': {'symptoms': ['Red eyes', 'Itchy eyes']},
+    'Eczema': {'symptoms': ['Skin rash', 'Dry skin']}
+}
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.delenv("CLINIFY_EMBEDDING_MODEL", raising=False)
+    return get_semantic_index(CONDITIONS, "test", str(tmp_path))
+
+def semantic_symptoms(text, index):
+    return extend_with_semantic_matches(text, [], {}, index)
+
+def test_unmatched_spans_skip_lexical_matches_and_split_conjunctions():
+    text = "I have a headache. My chest feels tight and I've been wheezing at night"
+    spans = [text[start:end].strip() for start, end in unmatched_spans(text, {'headache': [9, 17]})]
+
+    assert "I have a headache" not in spans
+    assert "My chest feels tight and I've been wheezing at night" in spans
+    assert "My chest feels tight" in spans
+    assert "I've been wheezing at night" in spans
+
+def test_covers_symptom_words_matches_stems_of_every_content_word():
+    assert covers_symptom_words("my chest feels tight", "Chest tightness")
+    assert covers_symptom_words("short of breath", "Shortness of breath")
+    assert not covers_symptom_words("my skin is red", "Red eyes")
+
+def test_hashed_matching_keeps_every_symptom_in_a_clause(index):
+    assert semantic_symptoms("My chest feels tight and I've been wheezing at night", index) == [
+        'Chest tightness', 'Wheezing'
+    ]
+    assert semantic_symptoms("my eyes are red and itchy", index) == ['Red eyes', 'Itchy eyes']
+
+def test_hashed_matching_rejects_single_shared_words(index):
+    assert semantic_symptoms("my skin is red", index) == []
+
+def test_unloadable_model_falls_back_to_hashed_features(monkeypatch):
+    def fail_to_load(name, device=None):
+        raise OSError(f"Can't load {name}: no network")
+
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=fail_to_load))
+    monkeypatch.setenv("CLINIFY_EMBEDDING_MODEL", "no-such-model")
+
+    assert get_embedder()['name'] == f"hashed-{HASHED_DIM}"
@@ -0,0 +1,76 @@
+from typing import Dict, Optional
+
+from utils.cache import CacheBackend, make_cache_key
+from utils.match_engine import extract_symptoms, get_candidate_limit, get_top_k, match_conditions
+from utils.semantic import extend_with_semantic_matches
+
+# Match results only depend on the input text and the catalog, so they can live long
+MATCH_CACHE_TTL = 24 * 60 * 60
+
+def analyze_symptoms(
+    symptoms_text: str,
+    catalog: Dict,
+    top_k: Optional[int] = None,
+    candidate_limit: Optional[int] = None
+) -> Dict:
+    """
+    Extract symptoms from free text and rank matching conditions
+    
+    Args:
+        symptoms_text: User-reported symptoms
+        catalog: Resources from `load_catalog_resources`
+        top_k: Number of ranked conditions to return, defaults to CLINIFY_TOP_K
+        candidate_limit: First-stage candidate budget, defaults to CLINIFY_CANDIDATE_LIMIT
+    """
+    top_k = top_k or get_top_k()
+    candidate_limit = candidate_limit or get_candidate_limit()
+    extracted_symptoms, context = extract_symptoms(symptoms_text, catalog['conditions'], catalog['lexicon'])
+    
+    # Optional semantic stage, only over spans the lexical pass left unmatched
+    if symptoms_text and catalog.get('semantic_index'):
+        extend_with_semantic_matches(symptoms_text, extracted_symptoms, context, catalog['semantic_index'])
+    
+    top_matches = []
+    if extracted_symptoms:
+        top_matches = match_conditions(
+            extracted_symptoms,
+            catalog['conditions'],
+            context,
+            index=catalog['index'],
+            candidate_limit=candidate_limit,
+            top_k=top_k
+        )
+    
+    return {
+        'symptoms_text': symptoms_text,
+        'extracted_symptoms': extracted_symptoms,
+        'top_matches': top_matches,
+        'context': context
+    }
+
+def analyze_symptoms_cached(
+    symptoms_text: str,
+    catalog: Dict,
+    cache: CacheBackend,
+    top_k: Optional[int] = None,
+    candidate_limit: Optional[int] = None
+) -> Dict:
+    """`analyze_symptoms` through the shared match-result cache"""
+    # Resolve the configured budgets first, so they are part of the cache key
+    top_k = top_k or get_top_k()
+    candidate_limit = candidate_limit or get_candidate_limit()
+    key = make_cache_key(
+        "match",
+        catalog['fingerprint'],
+        catalog['semantic_index']['embedder']['name'] if catalog.get('semantic_index') else None,
+        symptoms_text,
+        top_k,
+        candidate_limit
+    )
+    # Matching is fast and deterministic, so replicas that miss at the same
+    # time just compute it locally; no cross-replica lock round trips
+    value = cache.get(key)
+    if value is None:
+        value = analyze_symptoms(symptoms_text, catalog, top_k, candidate_limit)
+        cache.set(key, value, MATCH_CACHE_TTL)
+    return value
@@ -0,0 +1,300 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+# Backend selection: memory:// (default), sqlite:///path/to/cache.db or redis://host:port/db
+CACHE_URL_ENV = "CLINIFY_CACHE_URL"
+DEFAULT_CACHE_URL = "memory://"
+
+# How long a replica may hold the compute lock for a key before others take over
+DEFAULT_LOCK_TTL = 120
+# How often followers on other replicas check whether the leader has finished
+LOCK_POLL_INTERVAL = 0.1
+# SQLite caches delete expired rows once every this many writes
+SQLITE_PRUNE_INTERVAL = 100
+
+def make_cache_key(namespace: str, *parts: Any) -> str:
+    """Build a stable cache key from JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+class CacheBackend(ABC):
+    """
+    Key/value cache shared by the match-result and explanation caches
+
+    Values must be JSON-serializable; they are stored serialized so every
+    backend returns fresh copies. `add` only writes when the key is absent and
+    is what cross-replica request coalescing locks are built on.
+    """
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._get_raw(key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._set_raw(key, json.dumps(value), ttl)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        return self._add_raw(key, json.dumps(value), ttl)
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove `key` if present"""
+
+    @abstractmethod
+    def _get_raw(self, key: str) -> Optional[str]:
+        """Serialized value for `key`, or None if missing or expired"""
+
+    @abstractmethod
+    def _set_raw(self, key: str, raw: str, ttl: Optional[float]) -> None:
+        """Store a serialized value, replacing any existing one"""
+
+    @abstractmethod
+    def _add_raw(self, key: str, raw: str, ttl: Optional[float]) -> bool:
+        """Store a serialized value only if `key` is absent; returns whether it was stored"""
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache; the local stand-in when no shared backend is configured"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live_entry(self, key: str) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self._entries[key]
+            return None
+        return entry
+
+    def _get_raw(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _store(self, key: str, raw: str, ttl: Optional[float]) -> None:
+        self._entries[key] = (raw, time.time() + ttl if ttl else None)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _set_raw(self, key: str, raw: str, ttl: Optional[float]) -> None:
+        with self._lock:
+            self._store(key, raw, ttl)
+
+    def _add_raw(self, key: str, raw: str, ttl: Optional[float]) -> bool:
+        with self._lock:
+            if self._live_entry(key) is not None:
+                return False
+            self._store(key, raw, ttl)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+class SQLiteCache(CacheBackend):
+    """
+    File-backed cache shared by every process on the same host or volume
+
+    Expired rows are deleted every `prune_interval` writes made through this
+    instance, so the file doesn't grow with every distinct key ever cached.
+    """
+
+    def __init__(self, path: str, prune_interval: int = SQLITE_PRUNE_INTERVAL):
+        self.path = path
+        self.prune_interval = prune_interval
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _get_raw(self, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_raw(self, key: str, raw: str, ttl: Optional[float]) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, raw, time.time() + ttl if ttl else None)
+        )
+        self._count_write()
+
+    def _add_raw(self, key: str, raw: str, ttl: Optional[float]) -> bool:
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, raw, now + ttl if ttl else None)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._count_write()
+        return cursor.rowcount == 1
+
+    def _count_write(self) -> None:
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % self.prune_interval == 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete every expired row and return how many were removed"""
+        cursor = self._connection().execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+class RedisCache(CacheBackend):
+    """
+    Cache on any Redis-protocol server
+
+    Pass `client` to use an existing connection, e.g. a fakeredis instance in tests.
+    """
+
+    def __init__(self, url: Optional[str] = None, client: Any = None, prefix: str = "clinify:"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("Redis caching requires redis: pip install redis") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _get_raw(self, key: str) -> Optional[str]:
+        raw = self.client.get(self.prefix + key)
+        return raw.decode('utf-8') if isinstance(raw, bytes) else raw
+
+    def _set_raw(self, key: str, raw: str, ttl: Optional[float]) -> None:
+        self.client.set(self.prefix + key, raw, px=int(ttl * 1000) if ttl else None)
+
+    def _add_raw(self, key: str, raw: str, ttl: Optional[float]) -> bool:
+        return bool(self.client.set(self.prefix + key, raw, nx=True, px=int(ttl * 1000) if ttl else None))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+def create_cache_backend(url: str) -> CacheBackend:
+    """Create a cache backend from a memory://, sqlite:/// or redis:// URL"""
+    if url.startswith("memory://"):
+        return MemoryCache()
+    if url.startswith("sqlite:///"):
+        return SQLiteCache(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url)
+    raise ValueError(f"Unsupported cache URL: {url}")
+
+@lru_cache(maxsize=None)
+def get_cache_backend() -> CacheBackend:
+    """Process-wide cache backend configured through CLINIFY_CACHE_URL"""
+    return create_cache_backend(os.getenv(CACHE_URL_ENV, DEFAULT_CACHE_URL))
+
+# In-process single-flight state: key -> (done event, result holder)
+_inflight: Dict[str, tuple] = {}
+_inflight_lock = threading.Lock()
+
+def get_or_compute(
+    cache: CacheBackend,
+    key: str,
+    compute: Callable[[], Any],
+    ttl: Optional[float] = None,
+    lock_ttl: float = DEFAULT_LOCK_TTL
+) -> Any:
+    """
+    Return the cached value for `key`, computing and storing it on a miss
+
+    Concurrent misses for the same key are coalesced: within a process, one
+    thread computes while the others wait for its result; across processes,
+    a lock entry in the shared cache elects one leader and the rest poll until
+    the value appears or the lock expires. Exceptions are not cached.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    with _inflight_lock:
+        inflight = _inflight.get(key)
+        is_leader = inflight is None
+        if is_leader:
+            inflight = (threading.Event(), {})
+            _inflight[key] = inflight
+
+    done, holder = inflight
+    if not is_leader:
+        done.wait()
+        if 'error' in holder:
+            raise holder['error']
+        return holder['value']
+
+    try:
+        holder['value'] = _compute_with_shared_lock(cache, key, compute, ttl, lock_ttl)
+        return holder['value']
+    except Exception as e:
+        holder['error'] = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        done.set()
+
+def _compute_with_shared_lock(
+    cache: CacheBackend,
+    key: str,
+    compute: Callable[[], Any],
+    ttl: Optional[float],
+    lock_ttl: float
+) -> Any:
+    """Compute `key` once across processes sharing `cache`"""
+    lock_key = f"lock:{key}"
+
+    while not cache.add(lock_key, os.getpid(), lock_ttl):
+        # Another replica is computing; use its result once it lands
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+    try:
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            cache.set(key, value, ttl)
+        return value
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from utils.match_engine import build_condition_index, build_context_lexicon, get_risk_vocabulary
+from utils.semantic import get_semantic_index, is_semantic_enabled
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CATALOG_PATH = os.path.join(ROOT, 'data', 'conditions.json')
+
+# Registered catalogs as comma-separated name=path pairs, e.g.
+# "general=data/conditions.json,pediatrics=data/pediatrics.json". Relative paths
+# resolve against the repository root.
+CATALOGS_ENV = "CLINIFY_CATALOGS"
+DEFAULT_CATALOG_ENV = "CLINIFY_DEFAULT_CATALOG"
+DEFAULT_CATALOG_NAME = "general"
+
+def _intern_strings(value: Any) -> Any:
+    """Intern every string in parsed JSON so catalogs share identical vocabulary"""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [_intern_strings(item) for item in value]
+    if isinstance(value, dict):
+        return {sys.intern(key): _intern_strings(item) for key, item in value.items()}
+    return value
+
+@lru_cache(maxsize=None)
+def _load_conditions(path: str) -> tuple:
+    """Parse a catalog file once per process; returns (fingerprint, conditions)"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    # Content hash, so cached results never outlive a catalog change
+    return hashlib.sha256(raw).hexdigest()[:16], _intern_strings(json.loads(raw))
+
+@lru_cache(maxsize=None)
+def get_registered_risk_vocabulary() -> frozenset:
+    """Union of the risk factor vocabularies of every registered catalog"""
+    vocabulary = frozenset()
+    for path in get_catalog_paths().values():
+        vocabulary |= get_risk_vocabulary(_load_conditions(path)[1])
+    return vocabulary
+
+@lru_cache(maxsize=None)
+def load_catalog_resources(path: str = DEFAULT_CATALOG_PATH) -> Dict:
+    """
+    Load a conditions catalog and build its context lexicon and symptom index
+    
+    Results are cached per path for the lifetime of the process, so they are
+    shared by every Streamlit session served from it. Strings are interned and
+    every registered catalog uses one lexicon compiled over their combined risk
+    factor vocabulary, so each extra catalog only adds its own conditions and
+    posting lists. With CLINIFY_SEMANTIC set, the memory-mapped semantic
+    symptom index is loaded (or built) as well.
+    """
+    fingerprint, conditions = _load_conditions(path)
+    
+    return {
+        'fingerprint': fingerprint,
+        'conditions': conditions,
+        'lexicon': build_context_lexicon(conditions, get_registered_risk_vocabulary()),
+        'index': build_condition_index(conditions),
+        'semantic_index': get_semantic_index(conditions, fingerprint) if is_semantic_enabled() else None
+    }
+
+def get_catalog_paths() -> Dict[str, str]:
+    """Registered catalog names and their file paths"""
+    configured = os.getenv(CATALOGS_ENV, "").strip()
+    if not configured:
+        return {DEFAULT_CATALOG_NAME: DEFAULT_CATALOG_PATH}
+    
+    paths = {}
+    for entry in configured.split(","):
+        name, _, path = entry.partition("=")
+        if not name.strip() or not path.strip():
+            raise ValueError(f"Invalid {CATALOGS_ENV} entry: {entry!r} (expected name=path)")
+        paths[name.strip()] = os.path.join(ROOT, path.strip())
+    return paths
+
+def get_default_catalog_name() -> str:
+    """Catalog used when a request doesn't name one"""
+    return os.getenv(DEFAULT_CATALOG_ENV) or next(iter(get_catalog_paths()))
+
+def get_catalog(name: Optional[str] = None) -> Dict:
+    """Resources of the catalog registered as `name`, or of the default catalog"""
+    paths = get_catalog_paths()
+    name = name or get_default_catalog_name()
+    if name not in paths:
+        raise ValueError(f"Unknown catalog: {name} (available: {', '.join(paths)})")
+    return load_catalog_resources(paths[name])
+
+def warm_up(preload_llm: bool = False) -> Dict[str, Dict]:
+    """
+    Build resources for every registered catalog before the first request is served
+    
+    With `preload_llm`, the LLM stack is imported on a background thread so it
+    doesn't delay readiness but is usually loaded by the first explanation.
+    """
+    catalogs = {name: get_catalog(name) for name in get_catalog_paths()}
+    
+    if preload_llm:
+        from utils.llm_formatter import preload_llm_stack
+        threading.Thread(target=preload_llm_stack, name="llm-preload", daemon=True).start()
+    
+    return catalogs
@@ -0,0 +1,163 @@
+import os
+from typing import Dict, List, Optional
+
+from utils.match_engine import COMMON_SYMPTOMS
+
+# Analysis results are exported to Parquet in streaming row groups. Symptoms and
+# conditions are stored as integer IDs into dimension tables written next to the
+# results (<name>.symptoms.parquet, <name>.conditions.parquet). IDs depend only on
+# the catalog, so exports of the same catalog can be joined on them.
+DEFAULT_ROW_GROUP_SIZE = 65536
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow, pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Columnar export requires pyarrow: pip install pyarrow") from e
+
+def build_export_vocabulary(catalog: Dict) -> Dict:
+    """
+    Assign stable integer IDs to the catalog's conditions and symptoms
+
+    Symptom IDs cover everything the extractor can emit for this catalog: its
+    symptoms, the common-symptom names and the condition names (matched as
+    symptoms by the token pass), keyed case-insensitively.
+    """
+    symptoms = sorted(
+        {symptom.lower() for condition in catalog['conditions'].values() for symptom in condition['symptoms']}
+        | set(COMMON_SYMPTOMS)
+        | {condition.lower() for condition in catalog['conditions']}
+    )
+    conditions = sorted(catalog['conditions'])
+    return {
+        'symptoms': symptoms,
+        'symptom_ids': {symptom: i for i, symptom in enumerate(symptoms)},
+        'conditions': conditions,
+        'condition_ids': {condition: i for i, condition in enumerate(conditions)}
+    }
+
+class ResultExporter:
+    """
+    Stream analysis results from `analyze_symptoms` into a Parquet file
+
+    Rows are buffered and written one row group at a time, so memory stays
+    bounded by `row_group_size` regardless of how many results are exported.
+    Use as a context manager, or call `close()` to flush the last row group
+    and write the dimension tables. Symptoms outside the catalog vocabulary are
+    kept as strings in `other_symptoms` rather than given per-file IDs.
+    """
+
+    def __init__(self, path: str, catalog: Dict, row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+        self.pa, self.pq = _require_pyarrow()
+        self.path = path
+        self.catalog = catalog
+        self.row_group_size = row_group_size
+        self.vocabulary = build_export_vocabulary(catalog)
+        self.rows_written = 0
+        self._buffer = self._empty_buffer()
+        self._writer = self.pq.ParquetWriter(path, self._schema(), compression='zstd', use_dictionary=True)
+
+    def _schema(self):
+        pa = self.pa
+        ids = pa.list_(pa.int32())
+        scores = pa.list_(pa.float32())
+        # Parquet dictionary-encodes these strings on disk; nested dictionary
+        # arrays don't round-trip through readers, so they stay plain in memory
+        categories = pa.list_(pa.string())
+        return pa.schema([
+            ('input_id', pa.string()),
+            ('catalog', pa.dictionary(pa.int16(), pa.string())),
+            ('symptom_ids', ids),
+            ('symptom_confidence', scores),
+            ('other_symptoms', pa.list_(pa.string())),
+            ('other_symptom_confidence', scores),
+            ('duration', pa.string()),
+            ('severity', pa.dictionary(pa.int8(), pa.string())),
+            ('risk_factors', categories),
+            ('medications', categories),
+            ('lifestyle', categories),
+            ('negations', categories),
+            ('condition_ids', ids),
+            ('scores', scores),
+            ('base_scores', scores)
+        ])
+
+    def _empty_buffer(self) -> Dict[str, List]:
+        return {field: [] for field in (
+            'input_id', 'catalog', 'symptom_ids', 'symptom_confidence', 'other_symptoms',
+            'other_symptom_confidence', 'duration', 'severity',
+            'risk_factors', 'medications', 'lifestyle', 'negations', 'condition_ids', 'scores', 'base_scores'
+        )}
+
+    def add(self, input_id: str, analysis: Dict) -> None:
+        """Buffer one analysis result, writing a row group when the buffer is full"""
+        context = analysis.get('context') or {}
+        clues = context.get('context_clues', {})
+        confidence = context.get('symptom_confidence', {})
+        matches = analysis.get('top_matches', [])
+        buffer = self._buffer
+
+        symptom_ids = self.vocabulary['symptom_ids']
+        known = [symptom for symptom in analysis['extracted_symptoms'] if symptom.lower() in symptom_ids]
+        other = [symptom for symptom in analysis['extracted_symptoms'] if symptom.lower() not in symptom_ids]
+
+        buffer['input_id'].append(input_id)
+        buffer['catalog'].append(self.catalog['fingerprint'])
+        buffer['symptom_ids'].append([symptom_ids[symptom.lower()] for symptom in known])
+        buffer['symptom_confidence'].append([confidence.get(symptom, 1.0) for symptom in known])
+        buffer['other_symptoms'].append(other)
+        buffer['other_symptom_confidence'].append([confidence.get(symptom, 1.0) for symptom in other])
+        buffer['duration'].append(clues.get('duration'))
+        buffer['severity'].append(clues.get('severity'))
+        buffer['risk_factors'].append([factor for factor, _ in clues.get('risk_factors', [])])
+        buffer['medications'].append(list(clues.get('medications', [])))
+        buffer['lifestyle'].append(list(clues.get('lifestyle', [])))
+        buffer['negations'].append(list(clues.get('negations', [])))
+        buffer['condition_ids'].append([self.vocabulary['condition_ids'][match['condition']] for match in matches])
+        buffer['scores'].append([match['match_percentage'] for match in matches])
+        buffer['base_scores'].append([match['base_match_percentage'] for match in matches])
+
+        if len(buffer['input_id']) >= self.row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered rows as one row group"""
+        count = len(self._buffer['input_id'])
+        if not count:
+            return
+        table = self.pa.Table.from_pydict(self._buffer, schema=self._schema())
+        self._writer.write_table(table, row_group_size=count)
+        self.rows_written += count
+        self._buffer = self._empty_buffer()
+
+    def close(self) -> None:
+        """Flush remaining rows, finish the results file and write the dimension tables"""
+        self.flush()
+        self._writer.close()
+
+        stem, _ = os.path.splitext(self.path)
+        pa = self.pa
+        self.pq.write_table(pa.table({
+            'symptom_id': pa.array(range(len(self.vocabulary['symptoms'])), pa.int32()),
+            'symptom': self.vocabulary['symptoms']
+        }), f"{stem}.symptoms.parquet")
+        self.pq.write_table(pa.table({
+            'condition_id': pa.array(range(len(self.vocabulary['conditions'])), pa.int32()),
+            'condition': self.vocabulary['conditions'],
+            'severity': [self.catalog['conditions'][name].get('severity') for name in self.vocabulary['conditions']]
+        }), f"{stem}.conditions.parquet")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def export_results(path: str, catalog: Dict, results, row_group_size: Optional[int] = None) -> int:
+    """Write (input_id, analysis) pairs to Parquet and return the number of rows"""
+    with ResultExporter(path, catalog, row_group_size or DEFAULT_ROW_GROUP_SIZE) as exporter:
+        for input_id, analysis in results:
+            exporter.add(input_id, analysis)
+    return exporter.rows_written
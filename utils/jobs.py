@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+# Worker threads that own LLM calls; Streamlit reruns only poll job status
+DEFAULT_JOB_WORKERS = 8
+# Finished jobs are forgotten after this long; their results live on in the cache
+FINISHED_JOB_TTL = 15 * 60
+
+class JobQueue:
+    """
+    Local job queue keyed by content hash
+
+    Submitting a key that is pending, running or done returns the existing job
+    instead of starting another, so a rerun or a second view of the same
+    analysis never issues the work twice. Failed jobs are retried on the next
+    submit.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_JOB_WORKERS, finished_ttl: float = FINISHED_JOB_TTL):
+        self.finished_ttl = finished_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, fn: Callable[[], Any]) -> Dict:
+        """Start `fn` under `key` unless a live job for it exists; returns the job status"""
+        with self._lock:
+            self._evict_finished()
+            job = self._jobs.get(key)
+            if job is None or job['status'] == 'failed':
+                job = {
+                    'key': key,
+                    'status': 'pending',
+                    'result': None,
+                    'error': None,
+                    'submitted_at': time.time(),
+                    'finished_at': None
+                }
+                self._jobs[key] = job
+                job['future'] = self._executor.submit(self._run, job, fn)
+            return self._snapshot(job)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Current status of the job for `key`, or None if there is none"""
+        with self._lock:
+            job = self._jobs.get(key)
+            return self._snapshot(job) if job else None
+
+    def future(self, key: str) -> Optional[Future]:
+        """Future of the job for `key`, for callers that want to block with a timeout"""
+        with self._lock:
+            job = self._jobs.get(key)
+            return job['future'] if job else None
+
+    def _run(self, job: Dict, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            job['status'] = 'running'
+        try:
+            result = fn()
+        except Exception as e:
+            with self._lock:
+                job.update(status='failed', error=str(e), finished_at=time.time())
+            raise
+        with self._lock:
+            job.update(status='done', result=result, finished_at=time.time())
+        return result
+
+    def _evict_finished(self) -> None:
+        cutoff = time.time() - self.finished_ttl
+        expired = [key for key, job in self._jobs.items() if job['finished_at'] and job['finished_at'] < cutoff]
+        for key in expired:
+            del self._jobs[key]
+
+    @staticmethod
+    def _snapshot(job: Dict) -> Dict:
+        return {key: value for key, value in job.items() if key != 'future'}
+
+@lru_cache(maxsize=None)
+def get_job_queue() -> JobQueue:
+    """Process-wide job queue shared by every Streamlit session"""
+    return JobQueue()
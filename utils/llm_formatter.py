@@ -1,81 +1,39 @@
+import logging
 import os
-from typing import Dict, Optional, List
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from langchain_openai import ChatOpenAI
+import textwrap
+import time
+from concurrent.futures import wait
+from typing import Dict, Optional, List, Tuple
 
-def get_openai_llm():
-    """Initialize OpenAI LLM with optimal settings for medical analysis"""
-    try:
-        return ChatOpenAI(
-            model="gpt-4",
-            temperature=0.3,
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
-    except Exception as e:
-        raise Exception(f"Error initializing OpenAI model: {e}")
+from utils.cache import CacheBackend, get_or_compute, make_cache_key
+from utils.jobs import JobQueue, get_job_queue
+from utils.prompt_budget import count_tokens, dedupe_snippets, fit_prompt_to_budget
 
-def format_medical_context(context: Dict) -> str:
-    """Format medical context into a structured string"""
-    context_parts = []
-    
-    if context.get('duration'):
-        context_parts.append(f"Duration: {context['duration']}")
-    
-    if context.get('severity'):
-        context_parts.append(f"Severity Level: {context['severity']}")
-    
-    if context.get('medical_history'):
-        history = '; '.join(context['medical_history'])
-        context_parts.append(f"Medical History: {history}")
-    
-    if context.get('lifestyle'):
-        lifestyle = ', '.join(context['lifestyle'])
-        context_parts.append(f"Lifestyle Factors: {lifestyle}")
-    
-    if context.get('risk_factors'):
-        risks = '; '.join(f"{risk[0]}: {risk[1]}" for risk in context['risk_factors'])
-        context_parts.append(f"Risk Factors: {risks}")
-    
-    return "\n".join(context_parts) if context_parts else "No additional context available"
+logger = logging.getLogger(__name__)
 
-def get_explanation(
-    symptoms: str,
-    condition: str,
-    matched_symptoms: List[str],
-    context: Optional[Dict] = None,
-    match_data: Optional[Dict] = None
-) -> str:
-    """
-    Generate a comprehensive medical explanation using advanced LLM prompting
-    
-    Args:
-        symptoms: User-reported symptoms
-        condition: Diagnosed condition
-        matched_symptoms: List of matched symptoms
-        context: Additional medical context
-        match_data: Matching confidence and analysis data
-    """
-    try:
-        context = context or {}
-        match_data = match_data or {}
-        
-        # Format context information
-        context_str = format_medical_context(context)
-        
-        # Create confidence information
-        confidence_info = ""
-        if match_data:
-            confidence_info = f"""
-            Match Confidence: {match_data.get('confidence', 'Unknown')}
-            Base Match: {match_data.get('base_match_percentage', 0):.2%}
-            Context Score: {match_data.get('context_score', 0):.2%}
-            """
-        
-        # Enhanced medical analysis prompt
-        prompt_template = PromptTemplate(
-            input_variables=["symptoms", "condition", "matched_symptoms", "context", "confidence_info"],
-            template="""
+LLM_MODEL = "gpt-4"
+
+# Explanations are deterministic enough at temperature 0.3 to share across viewers
+EXPLANATION_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Seconds the UI waits for the LLM before showing a local summary instead. The
+# call keeps running in the background and its answer lands in the cache.
+EXPLANATION_DEADLINE_ENV = "CLINIFY_EXPLANATION_DEADLINE"
+DEFAULT_EXPLANATION_DEADLINE = 15.0
+
+# Upper bound for a single background LLM call, so abandoned calls don't pile up
+LLM_REQUEST_TIMEOUT = 120
+LLM_MAX_RETRIES = 1
+# The cross-replica compute lock must outlive every attempt of the leader's call,
+# or another replica would issue the same request while it is still running
+EXPLANATION_LOCK_TTL = LLM_REQUEST_TIMEOUT * (LLM_MAX_RETRIES + 1) + 30
+
+# The LLM stack (langchain, langchain_openai, openai) is imported inside the
+# functions below so sessions that never request an explanation don't pay for it
+
+# Enhanced medical analysis prompt. It is sent dedented so indentation doesn't
+# cost tokens; the indented source is kept to report what dedenting saves.
+_EXPLANATION_TEMPLATE_SOURCE = """
             You are an experienced medical analysis system with comprehensive knowledge of clinical diagnosis.
             Analyze the following case with careful attention to detail and medical accuracy:
 
@@ -140,31 +98,178 @@ def get_explanation(
             - Consider the full context of the patient's situation
             - Maintain a professional, evidence-based approach
             """
-        )
-        
-        # Initialize LLM and chain
-        llm = get_openai_llm()
-        chain = LLMChain(llm=llm, prompt=prompt_template)
-        
-        # Generate comprehensive analysis
-        result = chain.run({
-            "symptoms": symptoms,
-            "condition": condition,
-            "matched_symptoms": ", ".join(matched_symptoms),
-            "context": context_str,
-            "confidence_info": confidence_info
-        })
+EXPLANATION_TEMPLATE = textwrap.dedent(_EXPLANATION_TEMPLATE_SOURCE).strip()
+
+def get_openai_llm():
+    """Initialize OpenAI LLM with optimal settings for medical analysis"""
+    try:
+        from langchain_openai import ChatOpenAI
         
-        return result
-    
+        return ChatOpenAI(
+            model=LLM_MODEL,
+            temperature=0.3,
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout=LLM_REQUEST_TIMEOUT,
+            max_retries=LLM_MAX_RETRIES
+        )
     except Exception as e:
-        return f"""
+        raise Exception(f"Error initializing OpenAI model: {e}")
+
+def preload_llm_stack():
+    """Import the LLM stack ahead of the first explanation request"""
+    import langchain.chains  # noqa: F401
+    import langchain.prompts  # noqa: F401
+    import langchain_openai  # noqa: F401
+
+def format_medical_context(context: Dict, dedupe_history: bool = True) -> str:
+    """Format medical context into a structured string"""
+    context_parts = []
+    
+    if context.get('duration'):
+        context_parts.append(f"Duration: {context['duration']}")
+    
+    if context.get('severity'):
+        context_parts.append(f"Severity Level: {context['severity']}")
+    
+    if context.get('lifestyle'):
+        lifestyle = ', '.join(context['lifestyle'])
+        context_parts.append(f"Lifestyle Factors: {lifestyle}")
+    
+    if context.get('risk_factors'):
+        risks = '; '.join(f"{risk[0]}: {risk[1]}" for risk in context['risk_factors'])
+        context_parts.append(f"Risk Factors: {risks}")
+    
+    if context.get('negations'):
+        negations = ', '.join(context['negations'])
+        context_parts.append(f"Reported Absent: {negations}")
+    
+    # History goes last: it is the longest part and is cut first when the
+    # context is trimmed to its share of the token budget
+    if context.get('medical_history'):
+        snippets = dedupe_snippets(context['medical_history']) if dedupe_history else context['medical_history']
+        history = '; '.join(snippets)
+        context_parts.append(f"Medical History: {history}")
+    
+    return "\n".join(context_parts) if context_parts else "No additional context available"
+
+def run_explanation_chain(inputs: Dict[str, str]) -> str:
+    """Run the explanation prompt through the LLM; errors propagate to the caller"""
+    from langchain.prompts import PromptTemplate
+    from langchain.chains import LLMChain
+    
+    prompt_template = PromptTemplate(
+        input_variables=["symptoms", "condition", "matched_symptoms", "context", "confidence_info"],
+        template=EXPLANATION_TEMPLATE
+    )
+    
+    # Initialize LLM and chain
+    llm = get_openai_llm()
+    chain = LLMChain(llm=llm, prompt=prompt_template)
+    
+    # Generate comprehensive analysis
+    return chain.run(inputs)
+
+def get_explanation_deadline() -> float:
+    """Configured explanation deadline in seconds"""
+    return float(os.getenv(EXPLANATION_DEADLINE_ENV, DEFAULT_EXPLANATION_DEADLINE))
+
+def build_local_summary(condition: str, matched_symptoms: List[str], condition_data: Optional[Dict] = None) -> str:
+    """Summarize a condition from the catalog when the AI analysis isn't available in time"""
+    condition_data = condition_data or {}
+    parts = [f"### {condition}"]
+    
+    if condition_data.get('description'):
+        parts.append(condition_data['description'])
+    
+    parts.append(f"**Matched symptoms:** {', '.join(matched_symptoms)}")
+    
+    if condition_data.get('severity'):
+        parts.append(f"**Typical severity:** {condition_data['severity']}")
+    
+    if 'contagious' in condition_data:
+        parts.append(f"**Contagious:** {'Yes' if condition_data['contagious'] else 'No'}")
+    
+    if condition_data.get('risk_factors'):
+        risks = ', '.join(factor.replace('_', ' ') for factor in condition_data['risk_factors'])
+        parts.append(f"**Known risk factors:** {risks}")
+    
+    for field, title in (('treatment', 'Treatment Options'), ('prevention', 'Prevention Tips'), ('recommendations', 'Recommendations')):
+        if condition_data.get(field):
+            parts.append(f"#### {title}\n" + "\n".join(f"- {item}" for item in condition_data[field]))
+    
+    parts.append(
+        "*The detailed AI analysis is taking longer than expected. It will be shown here once it's ready.*"
+    )
+    return "\n\n".join(parts)
+
+def build_explanation_inputs(
+    symptoms: str,
+    condition: str,
+    matched_symptoms: List[str],
+    context: Optional[Dict] = None,
+    match_data: Optional[Dict] = None,
+    token_budget: Optional[int] = None
+) -> Tuple[Dict[str, str], Dict]:
+    """
+    Build the prompt variables for an explanation, compacted to the token budget
+    
+    Returns the inputs and the token report from `fit_prompt_to_budget`, whose
+    savings include template dedenting and history deduplication.
+    """
+    context = context or {}
+    match_data = match_data or {}
+    
+    # Accept either the context clues or the full extract_symptoms context
+    context_clues = context.get('context_clues', context)
+    
+    # Format context information
+    context_str = format_medical_context(context_clues)
+    
+    # Create confidence information
+    confidence_info = ""
+    if match_data:
+        confidence_info = f"""
+        Match Confidence: {match_data.get('confidence', 'Unknown')}
+        Base Match: {match_data.get('base_match_percentage', 0):.2%}
+        Context Score: {match_data.get('context_score', 0):.2%}
+        """
+    
+    inputs = {
+        "symptoms": symptoms,
+        "condition": condition,
+        "matched_symptoms": ", ".join(matched_symptoms),
+        "context": context_str,
+        "confidence_info": confidence_info
+    }
+    
+    # Size of the prompt before any compaction, for the tokens-saved report
+    original_tokens = count_tokens(_EXPLANATION_TEMPLATE_SOURCE.format(
+        **dict(inputs, context=format_medical_context(context_clues, dedupe_history=False))
+    ))
+    
+    # Keep the prompt within the input token budget
+    inputs, token_report = fit_prompt_to_budget(
+        EXPLANATION_TEMPLATE,
+        inputs,
+        context.get('symptom_offsets'),
+        token_budget,
+        original_tokens
+    )
+    logger.info(
+        "Explanation prompt for %s: %d tokens (%d saved, budget %d)",
+        condition, token_report['prompt_tokens'], token_report['tokens_saved'], token_report['budget']
+    )
+    return inputs, token_report
+
+def format_explanation_error(condition: str, matched_symptoms: List[str], error: Exception) -> str:
+    """Markdown shown when the explanation could not be generated"""
+    return f"""
         ### Error in Medical Analysis Generation
         
         We encountered an error while generating the detailed medical analysis.
         Please ensure your OpenAI API key is valid and try again.
         
-        Error details: {str(e)}
+        Error details: {str(error)}
         
         ### Important Notice
         
@@ -172,3 +277,143 @@ def get_explanation(
         However, this is not a definitive diagnosis. Please consult with a qualified healthcare provider
         for proper medical evaluation and treatment.
         """
+
+def explanation_view(
+    job: Dict,
+    condition: str,
+    matched_symptoms: List[str],
+    condition_data: Optional[Dict] = None,
+    deadline: Optional[float] = None
+) -> Dict[str, Optional[str]]:
+    """
+    What to show for an explanation job right now
+    
+    Returns the markdown `text` and its `source`: "cache" or "llm" when the job
+    is done, "error" when it failed, "fallback" with the local summary from
+    `condition_data` once the job has run past the deadline, and "pending"
+    with no text before that.
+    """
+    if job['status'] == 'done':
+        return {'text': job['result'], 'source': 'cache' if job['submitted_at'] is None else 'llm'}
+    if job['status'] == 'failed':
+        return {'text': format_explanation_error(condition, matched_symptoms, job['error']), 'source': 'error'}
+    
+    deadline = get_explanation_deadline() if deadline is None else deadline
+    if time.time() - job['submitted_at'] >= deadline:
+        return {'text': build_local_summary(condition, matched_symptoms, condition_data), 'source': 'fallback'}
+    return {'text': None, 'source': 'pending'}
+
+def submit_explanation_job(
+    symptoms: str,
+    condition: str,
+    matched_symptoms: List[str],
+    context: Optional[Dict] = None,
+    match_data: Optional[Dict] = None,
+    cache: Optional[CacheBackend] = None,
+    token_budget: Optional[int] = None,
+    queue: Optional[JobQueue] = None
+) -> Dict:
+    """
+    Queue an explanation on the background job queue, keyed by its prompt hash
+    
+    Returns the job status (see `JobQueue`) with the prompt's `token_report`;
+    poll it with `queue.get(job['key'])`. An identical prompt that is already
+    queued, running or cached is never sent to the LLM again.
+    """
+    inputs, token_report = build_explanation_inputs(
+        symptoms, condition, matched_symptoms, context, match_data, token_budget
+    )
+    key = make_cache_key("explanation", LLM_MODEL, inputs)
+    
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return {
+                'key': key, 'status': 'done', 'result': cached, 'error': None,
+                'submitted_at': None, 'finished_at': None, 'token_report': token_report
+            }
+        compute = lambda: get_or_compute(
+            cache, key, lambda: run_explanation_chain(inputs),
+            ttl=EXPLANATION_CACHE_TTL, lock_ttl=EXPLANATION_LOCK_TTL
+        )
+    else:
+        compute = lambda: run_explanation_chain(inputs)
+    
+    job = (queue or get_job_queue()).submit(key, compute)
+    job['token_report'] = token_report
+    return job
+
+def generate_explanation(
+    symptoms: str,
+    condition: str,
+    matched_symptoms: List[str],
+    context: Optional[Dict] = None,
+    match_data: Optional[Dict] = None,
+    cache: Optional[CacheBackend] = None,
+    token_budget: Optional[int] = None,
+    deadline: Optional[float] = None,
+    condition_data: Optional[Dict] = None,
+    queue: Optional[JobQueue] = None
+) -> Dict[str, str]:
+    """
+    Generate an explanation within a deadline
+    
+    Returns a dict with the markdown `text`, its `source` ("cache", "llm",
+    "fallback" when the deadline passed and the local summary from
+    `condition_data` is shown, or "error") and the prompt's `token_report`.
+    A fallback is temporary: the job keeps running and, with a cache, its
+    answer is stored there for the next request.
+    """
+    try:
+        queue = queue or get_job_queue()
+        job = submit_explanation_job(
+            symptoms, condition, matched_symptoms, context, match_data, cache, token_budget, queue
+        )
+        token_report = job['token_report']
+        if job['status'] in ('pending', 'running'):
+            # Wait out whatever is left of the deadline; the job may have been
+            # submitted earlier by another request
+            deadline = get_explanation_deadline() if deadline is None else deadline
+            remaining = deadline - (time.time() - job['submitted_at'])
+            wait([queue.future(job['key'])], timeout=max(0.0, remaining))
+            job = queue.get(job['key'])
+            # The deadline has been waited out, so an unfinished job falls back now
+            deadline = 0.0
+        
+        view = explanation_view(job, condition, matched_symptoms, condition_data, deadline)
+        if view['source'] == 'fallback':
+            logger.warning("Explanation for %s missed its deadline; serving local summary", condition)
+        return dict(view, token_report=token_report)
+    
+    except Exception as e:
+        return {'text': format_explanation_error(condition, matched_symptoms, e), 'source': 'error', 'token_report': None}
+
+def get_explanation(
+    symptoms: str,
+    condition: str,
+    matched_symptoms: List[str],
+    context: Optional[Dict] = None,
+    match_data: Optional[Dict] = None,
+    cache: Optional[CacheBackend] = None,
+    token_budget: Optional[int] = None,
+    deadline: Optional[float] = None,
+    condition_data: Optional[Dict] = None
+) -> str:
+    """
+    Generate a comprehensive medical explanation using advanced LLM prompting
+    
+    Args:
+        symptoms: User-reported symptoms
+        condition: Diagnosed condition
+        matched_symptoms: List of matched symptoms
+        context: Additional medical context
+        match_data: Matching confidence and analysis data
+        cache: Shared explanation cache; concurrent identical requests make one LLM call
+        token_budget: Input token budget for the prompt, defaults to CLINIFY_PROMPT_TOKEN_BUDGET
+        deadline: Seconds to wait for the LLM, defaults to CLINIFY_EXPLANATION_DEADLINE
+        condition_data: Catalog entry used for the local summary if the deadline passes
+    """
+    return generate_explanation(
+        symptoms, condition, matched_symptoms, context, match_data,
+        cache, token_budget, deadline, condition_data
+    )['text']
@@ -1,6 +1,142 @@
+import heapq
+import os
 import re
 import string
-from typing import Dict, List, Tuple, Set
+import sys
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Set
+
+# Ranking budgets: the cheap first stage keeps at most CLINIFY_CANDIDATE_LIMIT
+# conditions, the context-aware second stage returns CLINIFY_TOP_K of them.
+# Setting either to 0 removes that bound.
+CANDIDATE_LIMIT_ENV = "CLINIFY_CANDIDATE_LIMIT"
+TOP_K_ENV = "CLINIFY_TOP_K"
+DEFAULT_CANDIDATE_LIMIT = 50
+DEFAULT_TOP_K = 3
+
+# Destinations that make "trip to ..." / "traveled to ..." a tropical travel history
+TROPICAL_DESTINATIONS = [
+    "the tropics", "africa", "sub-saharan africa", "west africa", "east africa", "nigeria", "ghana",
+    "kenya", "tanzania", "uganda", "india", "bangladesh", "southeast asia", "thailand", "vietnam",
+    "cambodia", "indonesia", "the philippines", "papua new guinea", "central america",
+    "south america", "the amazon", "brazil", "peru", "colombia", "haiti", "the caribbean"
+]
+
+# Phrasings for the risk factor keys used in conditions.json. Keys that are not
+# listed here match on their own wording ("vitamin_d_deficiency" -> "vitamin d
+# deficiency"); listed keys match only the phrases given, so generic wording
+# ("diet", "environmental", a bare "tick" or "smoke") never counts as a risk factor.
+RISK_FACTOR_SYNONYMS = {
+    'close_contact': ["close contact", "contact with someone sick", "someone sick", "sick family member"],
+    'diet': ["gluten", "poor diet", "unhealthy diet"],
+    'environmental': ["pollution", "chemicals", "toxins", "toxic fumes", "sun exposure"],
+    'genetic': ["genetic", "family history", "runs in my family", "runs in the family", "hereditary", "inherited"],
+    'hormonal': ["hormonal", "hormone", "hormones", "pregnant", "pregnancy", "menopause", "birth control"],
+    'immune_system': ["autoimmune", "immune disorder"],
+    'living_conditions': ["poor living conditions", "crowded", "homeless", "shelter", "prison"],
+    'mosquito_bite': ["mosquito bite", "mosquito bites", "bitten by mosquitoes", "mosquitoes", "mosquito"],
+    'obesity': ["obesity", "obese", "overweight"],
+    'outdoor_activity': ["outdoor activity", "hiking", "camping", "hunting", "gardening"],
+    'smoking': [
+        "smoking", "smoker", "smokers", "smokes", "i smoke", "i smoked", "i've smoked", "have smoked",
+        "used to smoke", "smoked for", "smoke cigarettes", "cigarette", "cigarettes", "tobacco", "vaping", "i vape"
+    ],
+    'stress': ["stress", "stressed", "stressful"],
+    'tick_bite': ["tick bite", "tick bites", "bitten by a tick", "tick bitten"],
+    'trauma': ["trauma", "injury", "accident", "ptsd"],
+    'travel_tropical': [
+        "tropical country", "tropical countries", "tropical region", "tropical trip", "tropical vacation"
+    ] + [
+        f"{verb} {destination}"
+        for verb in ("trip to", "traveled to", "travelled to", "back from", "returned from", "visited")
+        for destination in TROPICAL_DESTINATIONS
+    ],
+    'viral_infection': ["viral infection", "virus", "mononucleosis", "epstein-barr"],
+    'vitamin_d_deficiency': ["vitamin d deficiency", "low vitamin d"],
+    'weakened_immune_system': [
+        "weakened immune system", "immunocompromised", "hiv", "chemotherapy", "chemo", "transplant"
+    ],
+    'wooded_areas': ["wooded areas", "woods", "forest", "wooded"]
+}
+
+# A negation cue in the few words before a risk factor or medication, within the
+# same clause ("never been a smoker", "no tick bites", "denies recent travel")
+NEGATION_PATTERN = re.compile(r"\b(?:no|not|never|none|without|denies|denied)\b|n't\b")
+CLAUSE_BOUNDARY_PATTERN = re.compile(r"[.;:!?,]|\b(?:but|although|though|however|except)\b")
+NEGATION_WINDOW_WORDS = 4
+
+# Risk factors that describe exposure to the patient's surroundings
+ENVIRONMENTAL_RISK_FACTORS = {
+    'environmental', 'living_conditions', 'mosquito_bite', 'outdoor_activity',
+    'tick_bite', 'travel_tropical', 'wooded_areas'
+}
+
+# Common medications and their brand or class names
+MEDICATION_TERMS = {
+    'acetaminophen': ["acetaminophen", "paracetamol", "tylenol"],
+    'ibuprofen': ["ibuprofen", "advil", "motrin"],
+    'aspirin': ["aspirin"],
+    'antibiotics': ["antibiotic", "antibiotics", "amoxicillin", "azithromycin"],
+    'antihistamines': ["antihistamine", "antihistamines", "cetirizine", "loratadine", "benadryl", "zyrtec", "claritin"],
+    'inhaler': ["inhaler", "albuterol"],
+    'corticosteroids': ["steroids", "corticosteroids", "prednisone"],
+    'insulin': ["insulin"],
+    'metformin': ["metformin"],
+    'antidepressants': ["antidepressant", "antidepressants", "ssri", "sertraline", "fluoxetine"],
+    'blood pressure medication': ["blood pressure medication", "lisinopril", "amlodipine"]
+}
+
+# Common symptom variations and synonyms (all in lowercase). Module-level so the
+# table is shared by every catalog instead of rebuilt per request
+COMMON_SYMPTOMS = {
+    "cold": ["cold", "common cold", "chill", "chills", "feeling cold"],
+    "headache": ["headache", "head pain", "head ache", "migraine", "head pressure"],
+    "fever": ["fever", "high temperature", "feeling hot", "temperature", "feverish"],
+    "cough": ["cough", "coughing", "dry cough", "wet cough", "persistent cough"],
+    "sore throat": ["sore throat", "throat pain", "throat ache", "painful throat", "scratchy throat"],
+    "runny nose": ["runny nose", "nasal discharge", "nose running", "rhinorrhea"],
+    "congestion": ["congestion", "stuffy nose", "blocked nose", "nasal congestion", "sinus"],
+    "fatigue": ["fatigue", "tired", "tiredness", "exhaustion", "exhausted", "low energy"],
+    "body ache": ["body ache", "muscle ache", "pain", "aches", "muscle pain", "body pain"],
+    "nausea": ["nausea", "feeling sick", "queasy", "sick to stomach"],
+    "vomiting": ["vomiting", "throwing up", "vomit", "threw up"],
+    "diarrhea": ["diarrhea", "loose stool", "watery stool", "frequent bowel"],
+    "dizziness": ["dizzy", "dizziness", "vertigo", "lightheaded", "light headed"],
+    "weakness": ["weak", "weakness", "feeling weak", "loss of strength"],
+    "chest pain": ["chest pain", "chest tightness", "chest pressure", "chest discomfort"],
+    "shortness of breath": ["shortness of breath", "breathless", "difficulty breathing", "hard to breathe"],
+    "stomach pain": ["stomach pain", "abdominal pain", "belly pain", "tummy pain"],
+    "joint pain": ["joint pain", "arthralgia", "painful joints", "joint ache"],
+    "rash": ["rash", "skin rash", "itchy skin", "skin irritation"],
+    "swelling": ["swelling", "swollen", "edema", "puffiness"],
+    "loss of appetite": ["loss of appetite", "poor appetite", "not hungry", "decreased appetite"],
+    "insomnia": ["insomnia", "can't sleep", "difficulty sleeping", "trouble sleeping", "sleeplessness"],
+    "anxiety": ["anxiety", "anxious", "worried", "nervousness", "panic"],
+    "depression": ["depression", "depressed", "feeling down", "low mood", "sadness"],
+    "back pain": ["back pain", "backache", "back ache", "pain in back"],
+    "stiff neck": ["stiff neck", "neck pain", "neck stiffness", "painful neck"],
+    "ear pain": ["ear pain", "earache", "ear ache", "painful ear"],
+    "eye pain": ["eye pain", "painful eye", "eye ache", "eye discomfort"],
+    "blurred vision": ["blurred vision", "blurry vision", "vision problems", "trouble seeing"],
+    "numbness": ["numbness", "numb", "tingling", "pins and needles"]
+}
+
+def _get_budget(env: str, default: int) -> Optional[int]:
+    value = int(os.getenv(env, default))
+    return value if value > 0 else None
+
+def get_candidate_limit() -> Optional[int]:
+    """Configured first-stage candidate budget, None when unbounded"""
+    return _get_budget(CANDIDATE_LIMIT_ENV, DEFAULT_CANDIDATE_LIMIT)
+
+def get_top_k() -> Optional[int]:
+    """Configured number of ranked conditions to return, None when unbounded"""
+    return _get_budget(TOP_K_ENV, DEFAULT_TOP_K)
+
+def _ranking_key(score: float, condition_name: str) -> tuple:
+    # Higher scores first, ties broken by condition name so the order doesn't
+    # depend on posting-list or catalog order
+    return (-score, condition_name)
 
 # We'll use a simpler tokenization approach to avoid NLTK dependency issues
 def preprocess_text(text: str) -> List[str]:
@@ -21,9 +157,69 @@ def preprocess_text(text: str) -> List[str]:
     
     return tokens
 
-def extract_context_clues(text: str) -> Dict:
+def compile_phrase_matcher(phrases: Dict[str, Tuple[str, str]]) -> Dict:
+    """
+    Compile a phrase -> (category, key) table into a single alternation regex
+    
+    Longer phrases come first so "weakened immune system" wins over "immune system",
+    and the whole vocabulary is matched in one pass over the text.
+    """
+    ordered = sorted(phrases, key=len, reverse=True)
+    pattern = r'\b(?:' + '|'.join(re.escape(phrase) for phrase in ordered) + r')\b' if ordered else r'(?!)'
+    return {
+        'pattern': re.compile(pattern),
+        'phrases': phrases
+    }
+
+def get_risk_vocabulary(conditions_data: Dict) -> frozenset:
+    """Lowercased risk factor keys used by a catalog"""
+    return frozenset(
+        risk_factor.lower()
+        for condition_data in conditions_data.values()
+        for risk_factor in condition_data.get('risk_factors', [])
+    )
+
+def build_context_lexicon(conditions_data: Dict, shared_vocabulary: frozenset = frozenset()) -> Dict:
+    """
+    Build the risk factor and medication matcher from the catalog's risk_factors vocabulary
+    
+    Pass the union of every served catalog's vocabulary as `shared_vocabulary`
+    so they all share one compiled matcher. The lexicon keeps the catalog's own
+    vocabulary, and risk factors outside it are not extracted for this catalog.
+    """
+    risk_vocabulary = get_risk_vocabulary(conditions_data)
+    return dict(_compile_context_lexicon(risk_vocabulary | shared_vocabulary), risk_vocabulary=risk_vocabulary)
+
+@lru_cache(maxsize=None)
+def _compile_context_lexicon(risk_vocabulary: frozenset) -> Dict:
+    phrases = {}
+    
+    for key in sorted(risk_vocabulary):
+        key = sys.intern(key)
+        for phrase in RISK_FACTOR_SYNONYMS.get(key, [key.replace('_', ' ')]):
+            phrases.setdefault(sys.intern(phrase), ('risk_factor', key))
+    
+    for medication, variations in MEDICATION_TERMS.items():
+        for variation in variations:
+            phrases.setdefault(variation, ('medication', medication))
+    
+    return compile_phrase_matcher(phrases)
+
+def is_negated(text_lower: str, start: int) -> bool:
+    """Whether a negation cue precedes position `start` within the same clause"""
+    preceding = text_lower[max(0, start - 60):start].replace('\u2019', "'")
+    clause = CLAUSE_BOUNDARY_PATTERN.split(preceding)[-1]
+    window = ' '.join(clause.split()[-NEGATION_WINDOW_WORDS:])
+    return bool(NEGATION_PATTERN.search(window))
+
+def extract_context_clues(text: str, lexicon: Optional[Dict] = None) -> Dict:
     """
     Enhanced context extraction with medical relevance
+    
+    Risk factors, environmental exposures and medications are only extracted
+    when a lexicon from `build_context_lexicon` is supplied. Negated mentions
+    ("never been a smoker") are not extracted; their keys are recorded in
+    `negations` instead.
     """
     context = {
         'duration': None,
@@ -32,7 +228,8 @@ def extract_context_clues(text: str) -> Dict:
         'environmental': [],
         'medical_history': [],
         'medications': [],
-        'lifestyle': []
+        'lifestyle': [],
+        'negations': []
     }
     
     # Enhanced duration patterns
@@ -81,19 +278,48 @@ def extract_context_clues(text: str) -> Dict:
             context['severity'] = level
             break
     
-    # Extract medical history
-    for pattern in medical_history_patterns:
-        matches = re.finditer(pattern, text.lower())
-        for match in matches:
-            start = max(0, match.start() - 30)
-            end = min(len(text), match.end() + 30)
-            context['medical_history'].append(text[start:end].strip())
+    # Extract medical history; overlapping windows around nearby cues are merged
+    # so each stretch of the note is quoted once
+    history_spans = sorted(
+        (max(0, match.start() - 30), min(len(text), match.end() + 30))
+        for pattern in medical_history_patterns
+        for match in re.finditer(pattern, text.lower())
+    )
+    merged_spans = []
+    for start, end in history_spans:
+        if merged_spans and start <= merged_spans[-1][1]:
+            merged_spans[-1][1] = max(merged_spans[-1][1], end)
+        else:
+            merged_spans.append([start, end])
+    context['medical_history'] = [text[start:end].strip() for start, end in merged_spans]
     
     # Extract lifestyle factors
     for category, pattern in lifestyle_patterns.items():
         if re.search(pattern, text.lower()):
             context['lifestyle'].append(category)
     
+    # Extract risk factors and medications in a single pass
+    if lexicon:
+        text_lower = text.lower()
+        for match in lexicon['pattern'].finditer(text_lower):
+            category, key = lexicon['phrases'][match.group(0)]
+            if category == 'risk_factor' and key not in lexicon.get('risk_vocabulary', (key,)):
+                # Matched through another catalog's vocabulary
+                continue
+            if is_negated(text_lower, match.start()):
+                if key not in context['negations']:
+                    context['negations'].append(key)
+                continue
+            if category == 'medication':
+                if key not in context['medications']:
+                    context['medications'].append(key)
+            elif all(factor != key for factor, _ in context['risk_factors']):
+                start = max(0, match.start() - 30)
+                end = min(len(text), match.end() + 30)
+                context['risk_factors'].append((key, text[start:end].strip()))
+                if key in ENVIRONMENTAL_RISK_FACTORS:
+                    context['environmental'].append(key)
+    
     return context
 
 def calculate_symptom_weight(symptom: str, condition_data: Dict) -> float:
@@ -118,62 +344,35 @@ def calculate_symptom_weight(symptom: str, condition_data: Dict) -> float:
     
     return base_weight
 
-def extract_symptoms(symptoms_text: str, conditions_data: Dict) -> Tuple[List[str], Dict]:
+def extract_symptoms(
+    symptoms_text: str,
+    conditions_data: Dict,
+    lexicon: Optional[Dict] = None
+) -> Tuple[List[str], Dict]:
     """
     Enhanced symptom extraction with medical context and common symptom variations
+    
+    Pass a prebuilt `lexicon` to avoid recompiling the context matcher per request.
     """
     if not symptoms_text:
         return [], {}
     
     # Get enhanced context
-    context = extract_context_clues(symptoms_text)
+    context = extract_context_clues(symptoms_text, lexicon or build_context_lexicon(conditions_data))
     
     # Preprocess input text
     tokens = preprocess_text(symptoms_text)
     text_lower = symptoms_text.lower()
     
-    # Common symptom variations and synonyms (all in lowercase)
-    common_symptoms = {
-        "cold": ["cold", "common cold", "chill", "chills", "feeling cold"],
-        "headache": ["headache", "head pain", "head ache", "migraine", "head pressure"],
-        "fever": ["fever", "high temperature", "feeling hot", "temperature", "feverish"],
-        "cough": ["cough", "coughing", "dry cough", "wet cough", "persistent cough"],
-        "sore throat": ["sore throat", "throat pain", "throat ache", "painful throat", "scratchy throat"],
-        "runny nose": ["runny nose", "nasal discharge", "nose running", "rhinorrhea"],
-        "congestion": ["congestion", "stuffy nose", "blocked nose", "nasal congestion", "sinus"],
-        "fatigue": ["fatigue", "tired", "tiredness", "exhaustion", "exhausted", "low energy"],
-        "body ache": ["body ache", "muscle ache", "pain", "aches", "muscle pain", "body pain"],
-        "nausea": ["nausea", "feeling sick", "queasy", "sick to stomach"],
-        "vomiting": ["vomiting", "throwing up", "vomit", "threw up"],
-        "diarrhea": ["diarrhea", "loose stool", "watery stool", "frequent bowel"],
-        "dizziness": ["dizzy", "dizziness", "vertigo", "lightheaded", "light headed"],
-        "weakness": ["weak", "weakness", "feeling weak", "loss of strength"],
-        "chest pain": ["chest pain", "chest tightness", "chest pressure", "chest discomfort"],
-        "shortness of breath": ["shortness of breath", "breathless", "difficulty breathing", "hard to breathe"],
-        "stomach pain": ["stomach pain", "abdominal pain", "belly pain", "tummy pain"],
-        "joint pain": ["joint pain", "arthralgia", "painful joints", "joint ache"],
-        "rash": ["rash", "skin rash", "itchy skin", "skin irritation"],
-        "swelling": ["swelling", "swollen", "edema", "puffiness"],
-        "loss of appetite": ["loss of appetite", "poor appetite", "not hungry", "decreased appetite"],
-        "insomnia": ["insomnia", "can't sleep", "difficulty sleeping", "trouble sleeping", "sleeplessness"],
-        "anxiety": ["anxiety", "anxious", "worried", "nervousness", "panic"],
-        "depression": ["depression", "depressed", "feeling down", "low mood", "sadness"],
-        "back pain": ["back pain", "backache", "back ache", "pain in back"],
-        "stiff neck": ["stiff neck", "neck pain", "neck stiffness", "painful neck"],
-        "ear pain": ["ear pain", "earache", "ear ache", "painful ear"],
-        "eye pain": ["eye pain", "painful eye", "eye ache", "eye discomfort"],
-        "blurred vision": ["blurred vision", "blurry vision", "vision problems", "trouble seeing"],
-        "numbness": ["numbness", "numb", "tingling", "pins and needles"]
-    }
-    
     # Create a set to track unique symptoms (case-insensitive)
     extracted_symptoms_set = set()
     extracted_symptoms = []
     symptom_contexts = {}
     symptom_confidence = {}
+    symptom_offsets = {}
     
     # First pass: Check for common symptoms and their variations
-    for main_symptom, variations in common_symptoms.items():
+    for main_symptom, variations in COMMON_SYMPTOMS.items():
         for variation in variations:
             if variation in text_lower:
                 main_symptom_lower = main_symptom.lower()
@@ -186,6 +385,7 @@ def extract_symptoms(symptoms_text: str, conditions_data: Dict) -> Tuple[List[st
                     end = min(len(text_lower), match_idx + len(variation) + 30)
                     symptom_contexts[main_symptom] = text_lower[start:end]
                     symptom_confidence[main_symptom] = 1.0
+                    symptom_offsets[main_symptom] = [match_idx, match_idx + len(variation)]
                 break
     
     # Second pass: Token-based matching for remaining symptoms
@@ -200,100 +400,191 @@ def extract_symptoms(symptoms_text: str, conditions_data: Dict) -> Tuple[List[st
                     extracted_symptoms.append(symptom)
                     symptom_contexts[symptom] = symptoms_text
                     symptom_confidence[symptom] = token_match_count / len(symptom_tokens)
+                    first_token = next(token for token in symptom_tokens if token in tokens)
+                    match_idx = text_lower.find(first_token)
+                    if match_idx >= 0:
+                        symptom_offsets[symptom] = [match_idx, match_idx + len(first_token)]
     
     return extracted_symptoms, {
         'symptom_contexts': symptom_contexts,
         'context_clues': context,
-        'symptom_confidence': symptom_confidence
+        'symptom_confidence': symptom_confidence,
+        'symptom_offsets': symptom_offsets
     }
 
-def match_conditions(symptoms: List[str], conditions_data: Dict, context: Dict = None) -> List[Dict]:
+def build_condition_index(conditions_data: Dict) -> Dict:
+    """
+    Build the symptom -> condition posting lists used by the first ranking stage
+    
+    Symptom and risk factor keys are interned, so catalogs that share vocabulary
+    share the strings.
+    """
+    postings = {}
+    total_weight = {}
+    risk_factor_conditions = {}
+    
+    for condition_name, condition_data in conditions_data.items():
+        for risk_factor in condition_data.get('risk_factors', []):
+            risk_factor_conditions.setdefault(sys.intern(risk_factor.lower()), []).append(condition_name)
+        
+        condition_total = 0
+        for symptom in condition_data['symptoms']:
+            weight = calculate_symptom_weight(symptom, condition_data)
+            condition_total += weight
+            postings.setdefault(sys.intern(symptom.lower()), []).append((condition_name, weight))
+        total_weight[condition_name] = condition_total
+    
+    return {
+        'postings': postings,
+        'total_weight': total_weight,
+        'risk_factor_conditions': risk_factor_conditions
+    }
+
+def generate_candidates(
+    symptoms: List[str],
+    index: Dict,
+    symptom_confidence: Optional[Dict] = None,
+    limit: Optional[int] = DEFAULT_CANDIDATE_LIMIT
+) -> List[Tuple[str, float, List[str]]]:
+    """
+    First ranking stage: score conditions from the index by weighted symptom overlap
+    and keep the best `limit` of them
+    """
+    symptom_confidence = symptom_confidence or {}
+    matched_weight = {}
+    matched_symptoms = {}
+    
+    for symptom in symptoms:
+        confidence = symptom_confidence.get(symptom, 1.0)
+        for condition_name, weight in index['postings'].get(symptom.lower(), ()):
+            matched_weight[condition_name] = matched_weight.get(condition_name, 0) + weight * confidence
+            matched_symptoms.setdefault(condition_name, []).append(symptom)
+    
+    candidates = [
+        (
+            condition_name,
+            weight / index['total_weight'][condition_name] if index['total_weight'][condition_name] > 0 else 0,
+            matched_symptoms[condition_name]
+        )
+        for condition_name, weight in matched_weight.items()
+    ]
+    
+    if limit is None or len(candidates) <= limit:
+        return candidates
+    # Partial selection: O(n log limit) instead of sorting the full candidate list
+    return heapq.nsmallest(limit, candidates, key=lambda candidate: _ranking_key(candidate[1], candidate[0]))
+
+def score_candidate(
+    condition_name: str,
+    condition_data: Dict,
+    base_match_percentage: float,
+    matched_symptoms: List[str],
+    context_clues: Dict,
+    risk_factor_hits: int = 0
+) -> Dict:
+    """
+    Second ranking stage: apply context adjustments to a single candidate
+    """
+    condition_symptoms = condition_data['symptoms']
+    
+    # Context-based adjustments
+    context_score = 0
+    
+    # Risk factor analysis
+    context_score += 0.15 * risk_factor_hits  # Increased weight for risk factors
+    
+    # Medical history analysis
+    for history_item in context_clues.get('medical_history', []):
+        if condition_name.lower() in history_item.lower():
+            context_score += 0.2
+    
+    # Severity alignment
+    if context_clues.get('severity') and 'severity' in condition_data:
+        if context_clues['severity'] == condition_data['severity']:
+            context_score += 0.1
+    
+    # Duration consideration
+    if context_clues.get('duration'):
+        duration_text = context_clues['duration'].lower()
+        if 'chronic' in condition_data.get('severity', '').lower() and 'chronic' in duration_text:
+            context_score += 0.15
+        elif 'acute' in condition_data.get('severity', '').lower() and any(word in duration_text for word in ['day', 'week', 'recent']):
+            context_score += 0.15
+    
+    # Calculate final score
+    adjusted_percentage = min(1.0, base_match_percentage + context_score)
+    
+    # Determine confidence level with original three levels
+    if adjusted_percentage >= 0.7:
+        confidence = "High"
+    elif adjusted_percentage >= 0.4:
+        confidence = "Medium"
+    else:
+        confidence = "Low"
+    
+    return {
+        'condition': condition_name,
+        'match_count': len(matched_symptoms),
+        'total_symptoms': len(condition_symptoms),
+        'match_percentage': adjusted_percentage,
+        'confidence': confidence,
+        'matched_symptoms': matched_symptoms,
+        'severity': condition_data.get('severity', 'Unknown'),
+        'context_factors': [factor for factor, _ in context_clues.get('risk_factors', [])],
+        'base_match_percentage': base_match_percentage,
+        'context_score': context_score
+    }
+
+def match_conditions(
+    symptoms: List[str],
+    conditions_data: Dict,
+    context: Dict = None,
+    index: Optional[Dict] = None,
+    candidate_limit: Optional[int] = DEFAULT_CANDIDATE_LIMIT,
+    top_k: Optional[int] = None
+) -> List[Dict]:
     """
     Enhanced condition matching with medical knowledge and context
+    
+    Ranking runs in two stages: `generate_candidates` pulls at most `candidate_limit`
+    conditions from the symptom index, then `score_candidate` applies the context
+    adjustments to those candidates only. Pass `top_k` to bound the returned list;
+    `None` for either budget disables that bound.
+    Risk factor bonuses come from the index's risk factor -> condition map.
     """
     if not symptoms:
         return []
     
-    matches = []
     context = context or {}
     context_clues = context.get('context_clues', {})
     symptom_confidence = context.get('symptom_confidence', {})
+    index = index or build_condition_index(conditions_data)
     
-    for condition_name, condition_data in conditions_data.items():
-        condition_symptoms = condition_data['symptoms']
-        matched_symptoms = [s for s in symptoms if s in condition_symptoms]
-        
-        if not matched_symptoms:
-            continue
-        
-        # Calculate weighted match score
-        total_weight = 0
-        matched_weight = 0
-        
-        for symptom in condition_symptoms:
-            weight = calculate_symptom_weight(symptom, condition_data)
-            total_weight += weight
-            if symptom in matched_symptoms:
-                confidence = symptom_confidence.get(symptom, 1.0)
-                matched_weight += weight * confidence
-        
-        base_match_percentage = matched_weight / total_weight if total_weight > 0 else 0
-        
-        # Context-based adjustments
-        context_score = 0
-        
-        # Risk factor analysis
-        if 'risk_factors' in condition_data:
-            for risk_factor in condition_data['risk_factors']:
-                risk_matches = [
-                    factor for factor, _ in context_clues.get('risk_factors', [])
-                    if risk_factor.lower() in factor.lower()
-                ]
-                if risk_matches:
-                    context_score += 0.15  # Increased weight for risk factors
-        
-        # Medical history analysis
-        for history_item in context_clues.get('medical_history', []):
-            if condition_name.lower() in history_item.lower():
-                context_score += 0.2
-        
-        # Severity alignment
-        if context_clues.get('severity') and 'severity' in condition_data:
-            if context_clues['severity'] == condition_data['severity']:
-                context_score += 0.1
-        
-        # Duration consideration
-        if context_clues.get('duration'):
-            duration_text = context_clues['duration'].lower()
-            if 'chronic' in condition_data.get('severity', '').lower() and 'chronic' in duration_text:
-                context_score += 0.15
-            elif 'acute' in condition_data.get('severity', '').lower() and any(word in duration_text for word in ['day', 'week', 'recent']):
-                context_score += 0.15
-        
-        # Calculate final score
-        adjusted_percentage = min(1.0, base_match_percentage + context_score)
-        
-        # Determine confidence level with original three levels
-        if adjusted_percentage >= 0.7:
-            confidence = "High"
-        elif adjusted_percentage >= 0.4:
-            confidence = "Medium"
-        else:
-            confidence = "Low"
-        
-        matches.append({
-            'condition': condition_name,
-            'match_count': len(matched_symptoms),
-            'total_symptoms': len(condition_symptoms),
-            'match_percentage': adjusted_percentage,
-            'confidence': confidence,
-            'matched_symptoms': matched_symptoms,
-            'context_factors': [factor for factor, _ in context_clues.get('risk_factors', [])],
-            'base_match_percentage': base_match_percentage,
-            'context_score': context_score
-        })
-    
-    # Sort by adjusted match percentage
-    matches.sort(key=lambda x: x['match_percentage'], reverse=True)
+    candidates = generate_candidates(symptoms, index, symptom_confidence, candidate_limit)
+    
+    # Count reported risk factors per condition once, so scoring is a lookup
+    risk_factor_hits = {}
+    for factor, _ in context_clues.get('risk_factors', []):
+        for condition_name in index['risk_factor_conditions'].get(factor, ()):
+            risk_factor_hits[condition_name] = risk_factor_hits.get(condition_name, 0) + 1
+    
+    matches = [
+        score_candidate(
+            condition_name,
+            conditions_data[condition_name],
+            base_match_percentage,
+            matched_symptoms,
+            context_clues,
+            risk_factor_hits.get(condition_name, 0)
+        )
+        for condition_name, base_match_percentage, matched_symptoms in candidates
+    ]
+    
+    # Rank by adjusted match percentage, ties by condition name
+    ranking_key = lambda x: _ranking_key(x['match_percentage'], x['condition'])
+    if top_k is not None and len(matches) > top_k:
+        return heapq.nsmallest(top_k, matches, key=ranking_key)
+    
+    matches.sort(key=ranking_key)
     
     return matches
@@ -0,0 +1,179 @@
+"""
+Opt-in request profiling for slow analyses
+
+Set CLINIFY_PROFILE to a sample rate between 0 and 1 (e.g. 0.1) to run cProfile
+on that share of requests; profiles are kept only for requests slower than
+CLINIFY_PROFILE_THRESHOLD_MS. Saved metadata holds timings and input sizes,
+never the input text. Unsampled requests cost one random() call.
+
+Usage: python -m utils.profiling list
+       python -m utils.profiling show <profile-id> [--sort cumulative] [--limit 30]
+       python -m utils.profiling folded <profile-id> > stacks.txt   # for flamegraph.pl / speedscope
+"""
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+PROFILE_RATE_ENV = "CLINIFY_PROFILE"
+PROFILE_THRESHOLD_ENV = "CLINIFY_PROFILE_THRESHOLD_MS"
+PROFILE_DIR_ENV = "CLINIFY_PROFILE_DIR"
+DEFAULT_PROFILE_THRESHOLD_MS = 500.0
+DEFAULT_PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "clinify", "profiles")
+
+# Only one cProfile profiler can be active at a time, so concurrent sampled
+# requests skip profiling rather than wait
+_profiler_lock = threading.Lock()
+
+def _sample_rate() -> float:
+    try:
+        return float(os.getenv(PROFILE_RATE_ENV, "0") or 0)
+    except ValueError:
+        return 0.0
+
+def get_profile_dir() -> str:
+    """Directory captured profiles are written to"""
+    return os.getenv(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR)
+
+@contextmanager
+def profile_request(name: str, input_size: int) -> Iterator[Dict]:
+    """
+    Profile the wrapped block when sampled, keeping the profile if it was slow
+
+    Args:
+        name: Entry point name, e.g. "analyze" or "batch"
+        input_size: Size of the input in characters; the text itself is never saved
+
+    Yields a dict the caller may add numeric fields to (e.g. symptom counts),
+    saved with the profile metadata.
+    """
+    record = {}
+    rate = _sample_rate()
+    if rate <= 0 or random.random() >= rate or not _profiler_lock.acquire(blocking=False):
+        yield record
+        return
+
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        try:
+            yield record
+        finally:
+            profiler.disable()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        threshold_ms = float(os.getenv(PROFILE_THRESHOLD_ENV, DEFAULT_PROFILE_THRESHOLD_MS))
+        if elapsed_ms >= threshold_ms:
+            _save_profile(profiler, name, elapsed_ms, input_size, record)
+    finally:
+        _profiler_lock.release()
+
+def _save_profile(profiler: cProfile.Profile, name: str, elapsed_ms: float, input_size: int, record: Dict) -> None:
+    profile_dir = get_profile_dir()
+    os.makedirs(profile_dir, exist_ok=True)
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{uuid.uuid4().hex[:8]}"
+
+    profiler.dump_stats(os.path.join(profile_dir, f"{profile_id}.prof"))
+    with open(os.path.join(profile_dir, f"{profile_id}.json"), 'w') as f:
+        json.dump({
+            'id': profile_id,
+            'name': name,
+            'timestamp': time.time(),
+            'elapsed_ms': round(elapsed_ms, 1),
+            'input_size': input_size,
+            **{key: value for key, value in record.items() if isinstance(value, (int, float))}
+        }, f)
+
+def list_profiles() -> List[Dict]:
+    """Metadata of captured profiles, newest first"""
+    profile_dir = get_profile_dir()
+    if not os.path.isdir(profile_dir):
+        return []
+
+    profiles = []
+    for filename in os.listdir(profile_dir):
+        if filename.endswith(".json"):
+            with open(os.path.join(profile_dir, filename), 'r') as f:
+                profiles.append(json.load(f))
+    return sorted(profiles, key=lambda profile: profile['timestamp'], reverse=True)
+
+def load_stats(profile_id: str) -> pstats.Stats:
+    """Load a captured profile by id"""
+    return pstats.Stats(os.path.join(get_profile_dir(), f"{profile_id}.prof"))
+
+def _function_label(func: tuple) -> str:
+    filename, line, function = func
+    return f"{function} ({os.path.basename(filename)}:{line})" if line else function
+
+def folded_stacks(stats: pstats.Stats, max_depth: int = 64) -> List[str]:
+    """
+    Approximate folded stacks ("a;b;c <microseconds>") for flame graph tools
+
+    cProfile only records caller -> callee edges, so each function's time is
+    split across call paths in proportion to the time spent under each caller.
+    """
+    entries = stats.stats
+    children = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, (_, _, _, edge_cumulative) in callers.items():
+            children.setdefault(caller, []).append((func, edge_cumulative))
+
+    lines = []
+
+    def emit(func, path, weight):
+        _, _, total_self, total_cumulative, _ = entries[func]
+        path = path + [_function_label(func)]
+        self_us = int(total_self * weight * 1e6)
+        if self_us > 0:
+            lines.append(f"{';'.join(path)} {self_us}")
+        if len(path) >= max_depth:
+            return
+        for child, edge_cumulative in children.get(func, ()):
+            child_cumulative = entries[child][3]
+            child_weight = weight * (edge_cumulative / child_cumulative if child_cumulative else 0)
+            if child_weight > 1e-4 and _function_label(child) not in path:
+                emit(child, path, child_weight)
+
+    for func, (_, _, _, _, callers) in entries.items():
+        if not callers:
+            emit(func, [], 1.0)
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List and render captured request profiles")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help="list captured profiles")
+    show = subparsers.add_parser('show', help="print the hottest functions of a profile")
+    show.add_argument('profile_id')
+    show.add_argument('--sort', default='cumulative', help="pstats sort key (cumulative, tottime, calls)")
+    show.add_argument('--limit', type=int, default=30)
+    folded = subparsers.add_parser('folded', help="print folded stacks for flamegraph.pl or speedscope")
+    folded.add_argument('profile_id')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        profiles = list_profiles()
+        if not profiles:
+            print(f"No profiles captured in {get_profile_dir()}")
+        for profile in profiles:
+            extras = ", ".join(
+                f"{key}={value}" for key, value in profile.items()
+                if key not in ('id', 'name', 'timestamp', 'elapsed_ms', 'input_size')
+            )
+            print(f"{profile['id']}  {profile['elapsed_ms']:>9.1f} ms  input {profile['input_size']} chars"
+                  + (f"  {extras}" if extras else ""))
+    elif args.command == 'show':
+        load_stats(args.profile_id).sort_stats(args.sort).print_stats(args.limit)
+    elif args.command == 'folded':
+        sys.stdout.write("\n".join(folded_stacks(load_stats(args.profile_id))) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Input token budget for the explanation prompt (instructions + patient data)
+PROMPT_TOKEN_BUDGET_ENV = "CLINIFY_PROMPT_TOKEN_BUDGET"
+DEFAULT_PROMPT_TOKEN_BUDGET = 1200
+# Share of the budget left after the template that the context may always use,
+# and the patient text is never cut below (unless it is shorter)
+CONTEXT_BUDGET_SHARE = 0.35
+MIN_SYMPTOM_TOKENS = 150
+
+# Rough stand-in for a BPE tokenizer when tiktoken isn't installed: words and
+# punctuation marks each count as one token
+_APPROX_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_TRUNCATION_MARKER = " ..."
+_SENTENCE_PATTERN = re.compile(r"[^.!?\n]+[.!?]*")
+
+def get_prompt_token_budget() -> int:
+    """Configured input token budget for explanation prompts"""
+    return int(os.getenv(PROMPT_TOKEN_BUDGET_ENV, DEFAULT_PROMPT_TOKEN_BUDGET))
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Local tiktoken encoding if available, otherwise None"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+def get_token_counter_name() -> str:
+    """Which counter `count_tokens` uses: the tiktoken encoding or the offline estimate"""
+    return "tiktoken:cl100k_base" if _get_encoding() is not None else "estimate"
+
+def count_tokens(text: str) -> int:
+    """Count tokens offline, with tiktoken when installed or a word/punctuation estimate"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(_APPROX_TOKEN_PATTERN.findall(text))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most `max_tokens` tokens"""
+    if max_tokens <= 0:
+        return ""
+
+    if count_tokens(text) <= max_tokens:
+        return text
+    # The truncation marker counts toward the limit too
+    keep = max_tokens - count_tokens(_TRUNCATION_MARKER)
+    if keep <= 0:
+        return ""
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text)[:keep]) + _TRUNCATION_MARKER
+    return text[:list(_APPROX_TOKEN_PATTERN.finditer(text))[keep - 1].end()] + _TRUNCATION_MARKER
+
+def select_symptom_sentences(text: str, symptom_offsets: Dict[str, List[int]]) -> str:
+    """Keep only the sentences of the patient text that contain an extracted symptom"""
+    starts = sorted(offset[0] for offset in symptom_offsets.values())
+    if not starts:
+        return text
+
+    kept = [
+        sentence.group(0).strip()
+        for sentence in _SENTENCE_PATTERN.finditer(text)
+        if any(sentence.start() <= start < sentence.end() for start in starts)
+    ]
+    return " ".join(kept) if kept else text
+
+def dedupe_snippets(snippets: List[str]) -> List[str]:
+    """Drop repeated history snippets, including ones contained in a longer snippet"""
+    unique = []
+    for snippet in sorted(set(snippets), key=len, reverse=True):
+        if not any(snippet.lower() in kept.lower() for kept in unique):
+            unique.append(snippet)
+    # Restore the original order of appearance
+    return sorted(unique, key=snippets.index)
+
+def fit_prompt_to_budget(
+    template: str,
+    inputs: Dict[str, str],
+    symptom_offsets: Optional[Dict[str, List[int]]] = None,
+    budget: Optional[int] = None,
+    original_tokens: Optional[int] = None
+) -> Tuple[Dict[str, str], Dict]:
+    """
+    Shrink the patient text and context in `inputs` until the rendered prompt fits the token budget
+
+    The patient text is first reduced to the sentences containing extracted
+    symptoms. The context is then cut to CONTEXT_BUDGET_SHARE of what the
+    template leaves (or more, if the patient text is short), and the patient
+    text is truncated, but never below MIN_SYMPTOM_TOKENS. Whatever is still
+    over comes out of the context. Pass `original_tokens` when the inputs were
+    already compacted upstream, so the report counts those savings too. A
+    warning is logged when the budget can't be met, e.g. because the template
+    alone exceeds it.
+
+    Returns:
+        The compacted inputs and a report with original_tokens, prompt_tokens,
+        tokens_saved, budget, over_budget and tokenizer
+    """
+    budget = budget or get_prompt_token_budget()
+    inputs = dict(inputs)
+    render = lambda: count_tokens(template.format(**inputs))
+    prompt_tokens = render()
+    if original_tokens is None:
+        original_tokens = prompt_tokens
+
+    if prompt_tokens > budget and symptom_offsets:
+        inputs['symptoms'] = select_symptom_sentences(inputs['symptoms'], symptom_offsets)
+        prompt_tokens = render()
+
+    if prompt_tokens > budget:
+        available = budget - count_tokens(template.format(**dict(inputs, symptoms="", context="")))
+        symptom_tokens = count_tokens(inputs['symptoms'])
+        context_tokens = count_tokens(inputs['context'])
+
+        context_cap = max(int(available * CONTEXT_BUDGET_SHARE), available - symptom_tokens)
+        if context_tokens > context_cap:
+            inputs['context'] = truncate_to_tokens(inputs['context'], context_cap)
+            prompt_tokens = render()
+
+        if prompt_tokens > budget:
+            keep = max(min(MIN_SYMPTOM_TOKENS, symptom_tokens), symptom_tokens - (prompt_tokens - budget))
+            inputs['symptoms'] = truncate_to_tokens(inputs['symptoms'], keep)
+            prompt_tokens = render()
+
+        if prompt_tokens > budget:
+            context_tokens = count_tokens(inputs['context'])
+            inputs['context'] = truncate_to_tokens(inputs['context'], context_tokens - (prompt_tokens - budget))
+            prompt_tokens = render()
+
+    if prompt_tokens > budget:
+        logger.warning("Prompt is %d tokens, over the %d token budget even after compaction", prompt_tokens, budget)
+
+    return inputs, {
+        'original_tokens': original_tokens,
+        'prompt_tokens': prompt_tokens,
+        'tokens_saved': original_tokens - prompt_tokens,
+        'budget': budget,
+        'over_budget': prompt_tokens > budget,
+        'tokenizer': get_token_counter_name()
+    }
@@ -0,0 +1,291 @@
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import random
+import re
+import struct
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Optional semantic extraction stage. Spans of the patient text that the lexical
+# pass left unmatched are embedded and looked up in an approximate nearest
+# neighbour index of every catalog symptom.
+SEMANTIC_ENV = "CLINIFY_SEMANTIC"
+EMBEDDING_MODEL_ENV = "CLINIFY_EMBEDDING_MODEL"
+INDEX_DIR_ENV = "CLINIFY_INDEX_DIR"
+DEFAULT_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "clinify")
+
+HASHED_DIM = 256
+EMBED_BATCH_SIZE = 32
+# Random hyperplanes for LSH bucketing; lookups also probe buckets one bit away
+LSH_PLANES = 10
+LSH_SEED = 13
+# Below this many symptoms an exact scan is cheap and avoids LSH misses
+EXACT_SEARCH_LIMIT = 4096
+# Minimum cosine similarity for a span to count as a symptom, per embedder kind.
+# Hashed matches must also cover every content word of the symptom (by stem), so
+# one shared word ("my skin is red" vs "Red eyes") isn't enough.
+HASHED_THRESHOLD = 0.45
+MODEL_THRESHOLD = 0.55
+# Symptoms kept per span, best first, among those above the threshold
+MAX_MATCHES_PER_SPAN = 2
+
+_VECTORS_MAGIC = b"CLNFYVEC"
+_SPAN_PATTERN = re.compile(r"[^.!?;,\n]+")
+# Clauses joined by a conjunction are also embedded piece by piece, since a
+# whole clause dilutes each symptom it mentions
+_CONJUNCTION_PATTERN = re.compile(r"\b(?:and|but|or|while|plus)\b", re.IGNORECASE)
+_WORD_PATTERN = re.compile(r"[a-z0-9']+")
+_STOPWORDS = {'a', 'an', 'and', 'at', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'when', 'with'}
+
+def is_semantic_enabled() -> bool:
+    """Whether the semantic stage is switched on through CLINIFY_SEMANTIC"""
+    return os.getenv(SEMANTIC_ENV, "0") not in ("", "0", "false", "False")
+
+def hashed_embedding(text: str, dim: int = HASHED_DIM) -> List[float]:
+    """
+    Dependency-free embedding from hashed word and character trigram features
+
+    Catches shared stems and word overlap ("chest feels tight" ~ "Chest tightness"),
+    not paraphrase; a sentence-transformers model does better when installed.
+    """
+    vector = [0.0] * dim
+    words = _WORD_PATTERN.findall(text.lower())
+    features = list(words)
+    for word in words:
+        padded = f"#{word}#"
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    for feature in features:
+        h = zlib.crc32(feature.encode('utf-8'))
+        vector[h % dim] += 1.0 if (h >> 16) & 1 else -1.0
+
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else vector
+
+def get_embedder() -> Dict:
+    """
+    Embedder for spans and symptoms: a local sentence-transformers model when
+    CLINIFY_EMBEDDING_MODEL names one and the package is installed, otherwise hashed features
+
+    A model that can't be loaded (missing package, typo, no network for the
+    download) logs a warning and falls back to hashed features, so the optional
+    semantic stage never takes the catalog down with it.
+    """
+    model_name = os.getenv(EMBEDDING_MODEL_ENV, "")
+    if model_name:
+        try:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name, device="cpu")
+
+            def embed_batch(texts: List[str]) -> List[List[float]]:
+                return model.encode(texts, batch_size=EMBED_BATCH_SIZE, normalize_embeddings=True).tolist()
+
+            return {
+                'name': model_name,
+                'dim': model.get_sentence_embedding_dimension(),
+                'threshold': MODEL_THRESHOLD,
+                'requires_word_overlap': False,
+                'embed_batch': embed_batch
+            }
+        except Exception as e:
+            logger.warning("Embedding model %r unavailable (%s); using hashed features", model_name, e)
+
+    return {
+        'name': f"hashed-{HASHED_DIM}",
+        'dim': HASHED_DIM,
+        'threshold': HASHED_THRESHOLD,
+        'requires_word_overlap': True,
+        'embed_batch': lambda texts: [hashed_embedding(text) for text in texts]
+    }
+
+def embed_in_batches(texts: List[str], embed_batch: Callable, batch_size: int = EMBED_BATCH_SIZE) -> List[List[float]]:
+    """Embed texts a batch at a time"""
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embed_batch(texts[start:start + batch_size]))
+    return vectors
+
+def _hyperplanes(dim: int) -> List[List[float]]:
+    rng = random.Random(LSH_SEED)
+    return [[rng.gauss(0, 1) for _ in range(dim)] for _ in range(LSH_PLANES)]
+
+def _bucket(vector, planes: List[List[float]]) -> int:
+    bucket = 0
+    for bit, plane in enumerate(planes):
+        if sum(p * v for p, v in zip(plane, vector)) >= 0:
+            bucket |= 1 << bit
+    return bucket
+
+def build_semantic_index(conditions_data: Dict, path: str, fingerprint: str, embedder: Dict) -> None:
+    """
+    Embed every catalog symptom and persist the vectors and LSH buckets under `path`
+
+    Vectors go to a flat float32 file that `load_semantic_index` memory-maps;
+    symptom names and buckets go to a JSON sidecar.
+    """
+    symptoms = sorted({symptom for condition in conditions_data.values() for symptom in condition['symptoms']})
+    vectors = embed_in_batches(symptoms, embedder['embed_batch'])
+    planes = _hyperplanes(embedder['dim'])
+
+    buckets = {}
+    for row, vector in enumerate(vectors):
+        buckets.setdefault(str(_bucket(vector, planes)), []).append(row)
+
+    os.makedirs(path, exist_ok=True)
+    vectors_path = os.path.join(path, "vectors.f32")
+    with open(vectors_path + ".tmp", 'wb') as f:
+        f.write(_VECTORS_MAGIC + struct.pack("<II", len(vectors), embedder['dim']))
+        for vector in vectors:
+            f.write(struct.pack(f"<{embedder['dim']}f", *vector))
+    os.replace(vectors_path + ".tmp", vectors_path)
+
+    meta_path = os.path.join(path, "meta.json")
+    with open(meta_path + ".tmp", 'w') as f:
+        json.dump({
+            'fingerprint': fingerprint,
+            'embedder': embedder['name'],
+            'symptoms': symptoms,
+            'buckets': buckets
+        }, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+def load_semantic_index(path: str, embedder: Dict) -> Dict:
+    """Memory-map a persisted index; vectors are read from the page cache on demand"""
+    with open(os.path.join(path, "meta.json"), 'r') as f:
+        meta = json.load(f)
+
+    with open(os.path.join(path, "vectors.f32"), 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header_size = len(_VECTORS_MAGIC) + 8
+    if mapped[:len(_VECTORS_MAGIC)] != _VECTORS_MAGIC:
+        raise ValueError(f"Not a semantic index: {path}")
+    count, dim = struct.unpack("<II", mapped[len(_VECTORS_MAGIC):header_size])
+
+    return {
+        'fingerprint': meta['fingerprint'],
+        'embedder': embedder,
+        'symptoms': meta['symptoms'],
+        'buckets': {int(bucket): rows for bucket, rows in meta['buckets'].items()},
+        'planes': _hyperplanes(dim),
+        'dim': dim,
+        'count': count,
+        'vectors': memoryview(mapped)[header_size:header_size + count * dim * 4].cast('f')
+    }
+
+def get_semantic_index(conditions_data: Dict, fingerprint: str, index_dir: Optional[str] = None) -> Dict:
+    """Load the catalog's semantic index from disk, building it first if missing or stale"""
+    embedder = get_embedder()
+    index_dir = index_dir or os.getenv(INDEX_DIR_ENV, DEFAULT_INDEX_DIR)
+    path = os.path.join(index_dir, f"semantic-{fingerprint}-{re.sub(r'[^A-Za-z0-9_.-]', '_', embedder['name'])}")
+
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        build_semantic_index(conditions_data, path, fingerprint, embedder)
+    return load_semantic_index(path, embedder)
+
+def nearest_symptoms(vector: List[float], index: Dict, limit: int = MAX_MATCHES_PER_SPAN * 4) -> List[Tuple[str, float]]:
+    """Approximate nearest catalog symptoms by cosine similarity, probing neighbouring LSH buckets"""
+    if index['count'] <= EXACT_SEARCH_LIMIT:
+        rows = range(index['count'])
+    else:
+        bucket = _bucket(vector, index['planes'])
+        rows = list(index['buckets'].get(bucket, ()))
+        for bit in range(LSH_PLANES):
+            rows.extend(index['buckets'].get(bucket ^ (1 << bit), ()))
+
+    dim = index['dim']
+    vectors = index['vectors']
+    scored = []
+    for row in rows:
+        offset = row * dim
+        scored.append((sum(a * b for a, b in zip(vector, vectors[offset:offset + dim])), row))
+    return [(index['symptoms'][row], score) for score, row in heapq.nlargest(limit, scored) if score > 0]
+
+def covers_symptom_words(span: str, symptom: str) -> bool:
+    """Whether every content word of `symptom` shares a stem with a word of `span`"""
+    span_words = _WORD_PATTERN.findall(span.lower())
+
+    def shares_stem(word: str, other: str) -> bool:
+        n = min(5, len(word), len(other))
+        return n >= 3 and word[:n] == other[:n]
+
+    return all(
+        any(shares_stem(word, span_word) for span_word in span_words)
+        for word in _WORD_PATTERN.findall(symptom.lower())
+        if word not in _STOPWORDS
+    )
+
+def unmatched_spans(text: str, symptom_offsets: Dict[str, List[int]]) -> List[Tuple[int, int]]:
+    """
+    Spans of `text` that don't overlap any lexically extracted symptom
+
+    Each clause is a span; a clause joined by conjunctions also contributes
+    its pieces ("my chest feels tight", "I've been wheezing at night").
+    """
+    def is_unmatched(start: int, end: int) -> bool:
+        return bool(text[start:end].strip()) and not any(
+            offset[0] < end and start < offset[1] for offset in symptom_offsets.values()
+        )
+
+    spans = []
+    for match in _SPAN_PATTERN.finditer(text):
+        start, end = match.span()
+        if is_unmatched(start, end):
+            spans.append((start, end))
+
+        piece_start = start
+        conjunctions = list(_CONJUNCTION_PATTERN.finditer(text, start, end))
+        for conjunction in conjunctions + [None]:
+            piece_end = conjunction.start() if conjunction else end
+            if conjunctions and is_unmatched(piece_start, piece_end):
+                spans.append((piece_start, piece_end))
+            if conjunction:
+                piece_start = conjunction.end()
+    return spans
+
+def extend_with_semantic_matches(
+    symptoms_text: str,
+    extracted_symptoms: List[str],
+    context: Dict,
+    index: Dict
+) -> List[str]:
+    """
+    Add symptoms found semantically in spans the lexical pass left unmatched
+
+    Up to MAX_MATCHES_PER_SPAN symptoms above the embedder's threshold are kept
+    per span. Matches are appended to `extracted_symptoms` and recorded in the
+    context's confidence, offsets and symptom_contexts, with the similarity as
+    confidence.
+    """
+    offsets = context.setdefault('symptom_offsets', {})
+    spans = unmatched_spans(symptoms_text, offsets)
+    if not spans:
+        return extracted_symptoms
+
+    embedder = index['embedder']
+    texts = [symptoms_text[start:end] for start, end in spans]
+    vectors = embed_in_batches(texts, embedder['embed_batch'])
+    seen = {symptom.lower() for symptom in extracted_symptoms}
+
+    for (start, end), span_text, vector in zip(spans, texts, vectors):
+        kept = 0
+        for symptom, score in nearest_symptoms(vector, index):
+            if score < embedder['threshold'] or kept >= MAX_MATCHES_PER_SPAN:
+                break
+            if embedder.get('requires_word_overlap') and not covers_symptom_words(span_text, symptom):
+                continue
+            kept += 1
+            if symptom.lower() in seen:
+                continue
+            seen.add(symptom.lower())
+            extracted_symptoms.append(symptom)
+            offsets[symptom] = [start, end]
+            context.setdefault('symptom_confidence', {})[symptom] = round(score, 3)
+            context.setdefault('symptom_contexts', {})[symptom] = span_text.strip()
+
+    return extracted_symptoms